@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 
-import csv
 import sys
-import bz2
 import argparse
 import os
-
-from nltk.corpus import wordnet as wn
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import wiktionary_dict
+import wordnet_cache
+import oxford_cache
+import profiling
+import records
+
+OXFORD_API_URL = os.getenv('OXFORD_API_URL', 'https://od-api.oxforddictionaries.com:443/api/v1')
+# Seconds before an Oxford API request is abandoned, so a stalled connection can't hang a prefetch
+REQUEST_TIMEOUT = 30
 
 
 def get_name(synset):
@@ -17,7 +23,7 @@ def get_name(synset):
 
 
 def get_lemmas(synset):
-    lemma_names = list(synset.lemma_names())
+    lemma_names = list(wordnet_cache.lemma_names(synset))
     return lemma_names
 
 
@@ -27,10 +33,10 @@ def get_adjectives(attribute):
     :param attribute: A string containing an attribute i.e. "temperature".
     :return: An array containing the attribute's adjectives i.e. ["hot", "cold", "warm", "cool"].
     """
-    synsets = wn.synsets(attribute, wn.NOUN)
+    synsets = wordnet_cache.synsets(attribute, wordnet_cache.NOUN)
     for synset in synsets:
-        if synset.attributes():
-            return synset.attributes()
+        if wordnet_cache.attributes(synset):
+            return list(wordnet_cache.attributes(synset))
     return []
 
 
@@ -48,7 +54,7 @@ def get_similar_synsets(synset):
             Synset('sizzling.s.01'), Synset('sultry.s.02'), Synset('sweltering.s.01'), Synset('thermal.s.03'),
             Synset('torrid.s.03'), Synset('tropical.s.04'), Synset('white.s.06')]
     """
-    return synset.similar_tos()
+    return list(wordnet_cache.similar_tos(synset))
 
 
 def filter_archaic_synsets(synsets):
@@ -57,10 +63,9 @@ def filter_archaic_synsets(synsets):
     :param synsets: an array containing WordNet synsets.
     :return: an array with archaic synsets removed.
     """
-    archaism = wn.synsets("archaism")[0]
     results = []
     for synset in synsets:
-        if archaism in synset.usage_domains():
+        if wordnet_cache.is_archaic(synset):
             continue
         else:
             results.append(synset)
@@ -80,18 +85,116 @@ def get_synsets_with_wordnet_extended(attribute):
     return result
 
 
-def get_oxford_definition(word, keywords=[], pos='a'):
+class RateLimiter:
+    """
+    Spaces out calls across threads so that no more than `rate` happen per second.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+def create_session(pool_size):
+    """
+    Creates a requests Session that keeps up to `pool_size` connections alive to the Oxford API.
+    """
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_oxford_credentials():
+    """
+    :return: An (app_id, app_key) tuple from the OXFORD_API_ID and OXFORD_API_KEY env variables, or None if one is
+    missing.
+    """
+    app_id = os.getenv('OXFORD_API_ID')
+    app_key = os.getenv('OXFORD_API_KEY')
+
+    if app_id is None:
+        print("Could not find oxford api key in env variable: OXFORD_API_ID")
+        return None
+    if app_key is None:
+        print("Could not find oxford api key in env variable: OXFORD_API_KEY")
+        return None
+    return app_id, app_key
+
+
+def fetch_oxford_entry(word, language='en', cache=None, offline=False, session=None, rate_limiter=None):
+    """
+    Retrieves a word's entry from the Oxford Dictionary API, going through the cache if one is given.
+    :param word: A string containing the word to look up.
+    :param language: A string containing the Oxford API language code.
+    :param cache: Optional oxford_cache.OxfordCache used to store and serve responses.
+    :param offline: If true, only serve responses from the cache and never make a request.
+    :param session: Optional requests Session to reuse connections across calls.
+    :param rate_limiter: Optional RateLimiter called before each request.
+    :return: A (status_code, json) tuple, or None if the entry couldn't be retrieved.
+    """
+    word = word.lower()
+    if cache is not None:
+        cached = cache.get(word, language)
+        profiling.count('oxford_cache.hits' if cached is not None else 'oxford_cache.misses')
+        if cached is not None:
+            return cached
+    if offline:
+        return None
+
+    credentials = get_oxford_credentials()
+    if credentials is None:
+        return None
+    (app_id, app_key) = credentials
+
+    if rate_limiter is not None:
+        rate_limiter.wait()
+    import requests
+    url = OXFORD_API_URL + '/entries/' + language + '/' + word
+    try:
+        with profiling.stage('oxford_http'):
+            r = (session or requests).get(url, headers={'app_id': app_id, 'app_key': app_key},
+                                          timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        # not cached, so the word is requested again on the next run
+        print("Oxford request failed for " + word + ": " + str(e))
+        return None
+    profiling.count('oxford_requests')
+
+    body = r.json() if r.status_code == 200 else None
+    # 404s are cached too so that words missing from Oxford aren't requested again
+    if cache is not None and r.status_code in (200, 404):
+        cache.put(word, r.status_code, body, language)
+    return r.status_code, body
+
+
+@profiling.counted
+def get_oxford_definition(word, keywords=[], pos='a', cache=None, offline=False):
     """
     Retrieves a word's definition from Oxford Dictionary.
     :param pos: A string specifying the word's part of speech.
+    :param cache: Optional oxford_cache.OxfordCache used to store and serve responses.
+    :param offline: If true, only serve definitions from the cache.
     :return: A string containing the word's definition.
     """
-    # wn.NOUN = 'n'
-    # wn.VERB = 'v'
-    # wn.ADJ = 'a'
-    # wn.ADV = 'r'
+    # wordnet_cache.NOUN = 'n'
+    # wordnet_cache.VERB = 'v'
+    # wordnet_cache.ADJ = 'a'
+    # wordnet_cache.ADV = 'r'
 
-    if pos != wn.NOUN and pos != wn.VERB and pos != wn.ADJ and pos != wn.ADV:
+    if pos != wordnet_cache.NOUN and pos != wordnet_cache.VERB and pos != wordnet_cache.ADJ \
+            and pos != wordnet_cache.ADV:
         print("Invalid part of speech: " + pos + ". Expected 'n', 'v', 'a', or 'r'.")
         return ""
 
@@ -104,24 +207,14 @@ def get_oxford_definition(word, keywords=[], pos='a'):
     else:
         lexical_category = "Adverb"
 
-    app_id = os.getenv('OXFORD_API_ID')
-    app_key = os.getenv('OXFORD_API_KEY')
-
-    if app_id is None:
-        print("Could not find oxford api key in env variable: OXFORD_API_ID")
-        return None
-    if app_key is None:
-        print("Could not find oxford api key in env variable: OXFORD_API_KEY")
+    response = fetch_oxford_entry(word, 'en', cache, offline)
+    if response is None:
         return None
-
-    language = 'en'
-
-    url = 'https://od-api.oxforddictionaries.com:443/api/v1/entries/' + language + '/' + word.lower()
-    r = requests.get(url, headers={'app_id': app_id, 'app_key': app_key})
+    status_code, body = response
 
     result = ""
-    if r.status_code == 200:
-        lexical_entries = r.json()["results"][0]["lexicalEntries"]
+    if status_code == 200:
+        lexical_entries = body["results"][0]["lexicalEntries"]
         for lexical_entry in lexical_entries:
             try:
                 if lexical_entry["lexicalCategory"] == lexical_category:
@@ -151,15 +244,15 @@ def get_oxford_definition(word, keywords=[], pos='a'):
     return result
 
 
+@profiling.counted
 def is_archaic(synset):
-    archaism = wn.synsets("archaism")[0]
-    return archaism in synset.usage_domains()
+    return wordnet_cache.is_archaic(synset)
 
 
 def get_most_likely_wordnet_definition(adjective, keywords):
     result = ""
-    for synset in wn.synsets(adjective, wn.ADJ):
-        definition = synset.definition()
+    for synset in wordnet_cache.synsets(adjective, wordnet_cache.ADJ):
+        definition = wordnet_cache.definition(synset)
         if result == "":
             result = definition
         else:
@@ -184,29 +277,83 @@ def get_keywords(synset):
                 keywords.extend(lemmas2)
     return keywords
 
-def write_see_also(synset, wiki, already_written, keywords, dict_writer):
+def collect_words(attribute, see_also):
+    """
+    Collects every word retrieve_definitions looks up, in the order it looks them up.
+    :param attribute: A string containing an attribute i.e. "temperature".
+    :param see_also: Boolean of whether or not to include see-also wordnet relations
+    :return: A list of unique words.
+    """
+    words = []
+    all_synsets = []
+    for synset in get_adjectives(attribute):
+        if not is_archaic(synset):
+            all_synsets.append(synset)
+            words.append(get_name(synset))
+            words.extend(get_lemmas(synset))
+            for similar_synset in get_similar_synsets(synset):
+                if not is_archaic(similar_synset):
+                    all_synsets.append(similar_synset)
+                    words.append(get_name(similar_synset))
+                    words.extend(get_lemmas(similar_synset))
+    if see_also:
+        for synset in all_synsets:
+            for see_also_synset in wordnet_cache.also_sees(synset):
+                if not is_archaic(see_also_synset):
+                    words.append(get_name(see_also_synset))
+                    words.extend(get_lemmas(see_also_synset))
+    return list(dict.fromkeys(words))
+
+
+def prefetch_oxford_entries(words, cache, workers, rate=None):
+    """
+    Fetches Oxford entries for all words concurrently through one pooled session and stores them in the cache,
+    so that later get_oxford_definition calls don't block on the network.
+    :param words: A list of words to fetch.
+    :param cache: An oxford_cache.OxfordCache or MemoryCache that receives the responses.
+    :param workers: Number of concurrent requests.
+    :param rate: Optional maximum number of requests per second.
+    """
+    # checked once here rather than by every thread for every word
+    if get_oxford_credentials() is None:
+        return
+    max_entries = getattr(cache, 'max_entries', None)
+    if max_entries is not None and len(set(words)) > max_entries:
+        print("Prefetching %d words into an Oxford cache limited to %d entries. The cache is allowed to grow "
+              "for this run, raise --cache_size to keep them." % (len(set(words)), max_entries))
+    session = create_session(workers)
+    rate_limiter = RateLimiter(rate)
+    with cache.deferred_eviction(), ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda word: fetch_oxford_entry(word, 'en', cache, session=session,
+                                                          rate_limiter=rate_limiter), words))
+    session.close()
+
+
+def write_see_also(synset, wiki, already_written, keywords, dict_writer, cache=None, offline=False):
     """
     :param synset: Original synset
     :param wiki: Wiktionary dict object
     :param keywords: A list of keywords for the original synset
     :param already_written: List of words that have already been used
-    :param dict_writer: A csv DictWriter object.
+    :param dict_writer: A csv DictWriter or records.RecordCollector object.
+    :param cache: Optional oxford_cache.OxfordCache for Oxford API responses
+    :param offline: If true, Oxford definitions are only served from the cache
     """
     synset_name = get_name(synset)
-    for see_also_synset in synset.also_sees():
+    for see_also_synset in wordnet_cache.also_sees(synset):
         if not is_archaic(see_also_synset):
             see_also_synset_name = get_name(see_also_synset)
             # If we have already written the word, don't write it again.
             if see_also_synset_name in already_written:
                 return
 
-            wordnet_def = see_also_synset.definition()
+            wordnet_def = wordnet_cache.definition(see_also_synset)
             try:
                 wiki_def = wiktionary_dict.get_most_likely_definition(wiki[see_also_synset_name]["A"],
                                                                       keywords)
             except KeyError:
                 wiki_def = ""
-            oxford_def = get_oxford_definition(see_also_synset_name, keywords)
+            oxford_def = get_oxford_definition(see_also_synset_name, keywords, cache=cache, offline=offline)
 
             dict_writer.writerow({'Source': synset_name, 'Relation': 'see_also', 'Word': see_also_synset_name,
                              'WordNet Definition': wordnet_def, 'Wiktionary Definition': wiki_def,
@@ -220,7 +367,7 @@ def write_see_also(synset, wiki, already_written, keywords, dict_writer):
                         wiki_def = wiktionary_dict.get_most_likely_definition(wiki[lemma]["A"], keywords)
                     except KeyError:
                         wiki_def = ""
-                    oxford_def3 = get_oxford_definition(lemma, keywords)
+                    oxford_def3 = get_oxford_definition(lemma, keywords, cache=cache, offline=offline)
 
                     dict_writer.writerow({'Source': see_also_synset_name, 'Relation': 'has_lemma',
                                      'Word': lemma,
@@ -229,103 +376,137 @@ def write_see_also(synset, wiki, already_written, keywords, dict_writer):
                                      'Oxford Definition': oxford_def3})
 
 
-def retrieve_definitions(attribute, wiktionary_path, see_also, output_path=None):
+def get_definition_rows(attribute, wiki, see_also, cache=None, offline=False):
+    """
+    Retrieves WordNet, Wikitionary, and Oxford definitions for an attribute's adjectives.
+    :param attribute: A string containing an attribute i.e. "temperature".
+    :param wiki: Wiktionary dict object
+    :param see_also: Boolean of whether or not to include see-also wordnet relations in clustering
+    :param cache: Optional oxford_cache.OxfordCache for Oxford API responses
+    :param offline: If true, Oxford definitions are only served from the cache
+    :return: A list of records.DefinitionRow, in the order they are written to `attribute`_definitions.csv
+    """
+    writer = records.RecordCollector(records.DefinitionRow)
+
+    synsets = get_adjectives(attribute)
+
+    keywords = [attribute]
+
+    for synset in synsets:
+        keywords.extend(get_keywords(synset))
+
+    all_synsets = set()
+    for synset in synsets:
+        if not is_archaic(synset):
+            all_synsets.add(synset)
+            synset_name = get_name(synset)
+
+            wordnet_def = wordnet_cache.definition(synset)
+            try:
+                wiki_def = wiktionary_dict.get_most_likely_definition(wiki[synset_name]["A"], keywords)
+            except KeyError:
+                wiki_def = ""
+            oxford_def = get_oxford_definition(synset_name, keywords, cache=cache, offline=offline)
+
+            writer.writerow({'Source': attribute, 'Relation': 'has_attribute', 'Word': synset_name,
+                             'WordNet Definition': wordnet_def, 'Wiktionary Definition': wiki_def,
+                             'Oxford Definition': oxford_def})
+
+            # add lemmas
+            lemmas = get_lemmas(synset)
+            for lemma in lemmas:
+                if lemma != synset_name:
+                    try:
+                        wiki_def = wiktionary_dict.get_most_likely_definition(wiki[lemma]["A"], keywords)
+                    except KeyError:
+                        wiki_def = ""
+                    oxford_def = get_oxford_definition(lemma, keywords, cache=cache, offline=offline)
+
+                    writer.writerow({'Source': synset_name, 'Relation': 'has_lemma', 'Word': lemma,
+                                     'WordNet Definition': wordnet_def, 'Wiktionary Definition': wiki_def,
+                                     'Oxford Definition': oxford_def})
+
+            # add similar synsets
+            similar_synsets = get_similar_synsets(synset)
+            for similar_synset in similar_synsets:
+                if not is_archaic(similar_synset):
+                    all_synsets.add(similar_synset)
+                    similar_synset_name = get_name(similar_synset)
+
+                    wordnet_def = wordnet_cache.definition(similar_synset)
+                    try:
+                        wiki_def = wiktionary_dict.get_most_likely_definition(wiki[similar_synset_name]["A"],
+                                                                              keywords)
+                    except KeyError:
+                        wiki_def = ""
+                    oxford_def = get_oxford_definition(similar_synset_name, keywords, cache=cache, offline=offline)
+
+                    writer.writerow({'Source': synset_name, 'Relation': 'similar_tos', 'Word': similar_synset_name,
+                                     'WordNet Definition': wordnet_def, 'Wiktionary Definition': wiki_def,
+                                     'Oxford Definition': oxford_def})
+
+                    # add similar synsets' lemmas
+                    lemmas = get_lemmas(similar_synset)
+                    for lemma in lemmas:
+                        if lemma != similar_synset_name:
+                            try:
+                                wiki_def = wiktionary_dict.get_most_likely_definition(wiki[lemma]["A"], keywords)
+                            except KeyError:
+                                wiki_def = ""
+                            oxford_def3 = get_oxford_definition(lemma, keywords, cache=cache, offline=offline)
+
+                            writer.writerow({'Source': similar_synset_name, 'Relation': 'has_lemma',
+                                             'Word': lemma,
+                                             'WordNet Definition': wordnet_def,
+                                             'Wiktionary Definition': wiki_def,
+                                             'Oxford Definition': oxford_def3})
+
+    # Return see-also relations for all found synsets if true
+    if see_also:
+        already_used = [get_name(s) for s in all_synsets]
+        for s in all_synsets:
+            write_see_also(s, wiki, already_used, keywords, writer, cache, offline)
+    return list(writer)
+
+
+def retrieve_definitions(attribute, wiktionary_path, see_also, output_path=None, cache=None, offline=False,
+                         workers=1, rate=None, wiki=None, write_csv=True):
     """
     Creates a file called [attribute]_definitions.csv with WordNet, Wikitionary, and Oxford definitions.
     :param attribute: A string containing an attribute i.e. "temperature".
-    :param wiktionary_path: Path to 2011-08-01_OntoWiktionary_EN.xml.bz2
+    :param wiktionary_path: Path to 2011-08-01_OntoWiktionary_EN.xml.bz2 or an index built by wiktionary_dict.build_index
     :param see_also: Boolean of whether or not to include see-also wordnet relations in clustering
     :param output_path: Optional path to output csv file. Defaults to `attribute`_definitions.csv
+    :param cache: Optional oxford_cache.OxfordCache for Oxford API responses
+    :param offline: If true, Oxford definitions are only served from the cache
+    :param workers: Number of concurrent Oxford requests. If more than 1, all definitions are fetched before writing.
+    :param rate: Optional maximum number of Oxford requests per second when fetching concurrently
+    :param wiki: Optional Wiktionary dict already loaded from wiktionary_path, to share it across attributes
+    :param write_csv: If false, only returns the rows without writing the csv file
+    :return: A list of records.DefinitionRow
     """
-    wiki = wiktionary_dict.load_ontology(bz2.open(wiktionary_path))
+    if workers > 1 and not offline:
+        if cache is None:
+            cache = oxford_cache.MemoryCache()
+        with profiling.stage('oxford_prefetch'):
+            prefetch_oxford_entries(collect_words(attribute, see_also), cache, workers, rate)
+
+    if wiki is None:
+        with profiling.stage('load_wiktionary'):
+            # only adjective senses are looked up below
+            wiki = wiktionary_dict.open_ontology(wiktionary_path, pos='A')
 
     if output_path:
         csv_path = output_path
     else:
         csv_path = attribute + '_definitions.csv'
-    with open(csv_path, 'w') as csvfile:
-        fieldnames = ['Source', 'Relation', 'Word', 'WordNet Definition', 'Wiktionary Definition', 'Oxford Definition']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-        synsets = get_adjectives(attribute)
-
-        keywords = [attribute]
-
-        for synset in synsets:
-            keywords.extend(get_keywords(synset))
-
-        all_synsets = set()
-        for synset in synsets:
-            if not is_archaic(synset):
-                all_synsets.add(synset)
-                synset_name = get_name(synset)
-
-                wordnet_def = synset.definition()
-                try:
-                    wiki_def = wiktionary_dict.get_most_likely_definition(wiki[synset_name]["A"], keywords)
-                except KeyError:
-                    wiki_def = ""
-                oxford_def = get_oxford_definition(synset_name, keywords)
-
-                writer.writerow({'Source': attribute, 'Relation': 'has_attribute', 'Word': synset_name,
-                                 'WordNet Definition': wordnet_def, 'Wiktionary Definition': wiki_def,
-                                 'Oxford Definition': oxford_def})
-
-                # add lemmas
-                lemmas = get_lemmas(synset)
-                for lemma in lemmas:
-                    if lemma != synset_name:
-                        try:
-                            wiki_def = wiktionary_dict.get_most_likely_definition(wiki[lemma]["A"], keywords)
-                        except KeyError:
-                            wiki_def = ""
-                        oxford_def = get_oxford_definition(lemma, keywords)
-
-                        writer.writerow({'Source': synset_name, 'Relation': 'has_lemma', 'Word': lemma,
-                                         'WordNet Definition': wordnet_def, 'Wiktionary Definition': wiki_def,
-                                         'Oxford Definition': oxford_def})
-
-                # add similar synsets
-                similar_synsets = get_similar_synsets(synset)
-                for similar_synset in similar_synsets:
-                    if not is_archaic(similar_synset):
-                        all_synsets.add(similar_synset)
-                        similar_synset_name = get_name(similar_synset)
-
-                        wordnet_def = similar_synset.definition()
-                        try:
-                            wiki_def = wiktionary_dict.get_most_likely_definition(wiki[similar_synset_name]["A"],
-                                                                                  keywords)
-                        except KeyError:
-                            wiki_def = ""
-                        oxford_def = get_oxford_definition(similar_synset_name, keywords)
-
-                        writer.writerow({'Source': synset_name, 'Relation': 'similar_tos', 'Word': similar_synset_name,
-                                         'WordNet Definition': wordnet_def, 'Wiktionary Definition': wiki_def,
-                                         'Oxford Definition': oxford_def})
-
-                        # add similar synsets' lemmas
-                        lemmas = get_lemmas(similar_synset)
-                        for lemma in lemmas:
-                            if lemma != similar_synset_name:
-                                try:
-                                    wiki_def = wiktionary_dict.get_most_likely_definition(wiki[lemma]["A"], keywords)
-                                except KeyError:
-                                    wiki_def = ""
-                                oxford_def3 = get_oxford_definition(lemma, keywords)
-
-                                writer.writerow({'Source': similar_synset_name, 'Relation': 'has_lemma',
-                                                 'Word': lemma,
-                                                 'WordNet Definition': wordnet_def,
-                                                 'Wiktionary Definition': wiki_def,
-                                                 'Oxford Definition': oxford_def3})
-
-        # Return see-also relations for all found synsets if true
-        if see_also:
-            already_used = [get_name(s) for s in all_synsets]
-            for s in all_synsets:
-                write_see_also(s, wiki, already_used, keywords, writer)
+    with profiling.stage('retrieve_definitions'):
+        definitions = get_definition_rows(attribute, wiki, see_also, cache, offline)
+    if write_csv:
+        with profiling.stage('write_definitions'):
+            records.write_definitions(definitions, csv_path)
+    return definitions
+
 
 if __name__ == '__main__':
     # example:
@@ -333,9 +514,21 @@ if __name__ == '__main__':
     # creates the file temperature_definitions.csv or overwrites existing file
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("wiktionary", help="Path to 2011-08-01_OntoWiktionary_EN.xml.bz2", type=str)
+    parser.add_argument("wiktionary", help="Path to 2011-08-01_OntoWiktionary_EN.xml.bz2 or to a .sqlite index "
+                                           "built with `wiktionary_dict.py --build_index`", type=str)
     parser.add_argument("input_term", help='A string containing an attribute i.e. "temperature"')
     parser.add_argument("--see_also", help="Should the definitions collected include the `see-also` wordnet relation?", action='store_true')
+    parser.add_argument("--oxford_cache", help="Path to a cache of Oxford API responses. Defaults to the OXFORD_CACHE "
+                                               "env variable; no caching if neither is set", type=str)
+    parser.add_argument("--cache_ttl", help="Days before a cached Oxford response expires", type=float,
+                        default=oxford_cache.DEFAULT_TTL / (24 * 60 * 60))
+    parser.add_argument("--cache_size", help="Maximum number of cached Oxford responses", type=int,
+                        default=oxford_cache.DEFAULT_MAX_ENTRIES)
+    parser.add_argument("--offline", help="Only use cached Oxford responses, never call the API", action='store_true')
+    parser.add_argument("--workers", help="Number of concurrent Oxford API requests", type=int, default=1)
+    parser.add_argument("--rate", help="Maximum Oxford API requests per second", type=float)
     args = parser.parse_args()
 
-    retrieve_definitions(args.input_term, args.wiktionary, args.see_also)
+    cache = oxford_cache.get_cache(args.oxford_cache, args.cache_ttl * 24 * 60 * 60, args.cache_size)
+    retrieve_definitions(args.input_term, args.wiktionary, args.see_also, cache=cache, offline=args.offline,
+                         workers=args.workers, rate=args.rate)
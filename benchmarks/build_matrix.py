@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Times matrix assembly on a synthetic equations file against the previous variables.index() based loop.
+
+> python3 benchmarks/build_matrix.py --words 10000
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from matrix_creation import read_equations, create_dict_from_equations, get_connected_equations, build_matrix
+
+
+def write_synthetic_equations(equations_csv_path, num_words, equations_per_word, seed=0):
+    """
+    Writes an equations csv in the format of `equation_creation.py` where every word is connected to high_prop.
+    """
+    rng = random.Random(seed)
+    words = ["word" + str(i) for i in range(num_words)]
+    with open(equations_csv_path, 'w') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=['Word', 'Variable', 'Factor', 'Definition', 'Deduced'])
+        writer.writeheader()
+        for (i, word) in enumerate(words):
+            # link each word to an earlier one (or high_prop) so the whole vocabulary is connected
+            variables = ["high_prop" if i == 0 else words[rng.randrange(i)]]
+            variables.extend(rng.choice(words) for _ in range(equations_per_word - 1))
+            for variable in variables:
+                if variable == word:
+                    continue
+                factor = rng.choice([-1, 1, 1.4, 0.8, 0.6])
+                writer.writerow({'Word': word, 'Variable': variable, 'Factor': str(factor), 'Definition': ''})
+                writer.writerow({'Word': variable, 'Variable': word, 'Factor': str(1.0 / factor),
+                                 'Definition': '', 'Deduced': 'Yes'})
+
+
+def build_matrix_entries_unindexed(equations_csv_path, variables, connected_equations_dict):
+    # matrix assembly before the word -> column mapping, re-reading the csv and calling variables.index() per row
+    rows = []
+    columns = []
+    values = []
+    with open(equations_csv_path, 'r') as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            word = row["Word"]
+            variable = row["Variable"]
+            factor = float(row["Factor"])
+            if row["Deduced"] != "Yes" and word in connected_equations_dict:
+                rows.extend([variables.index(word), variables.index(word)])
+                columns.extend([variables.index(word), variables.index(variable)])
+                values.extend([1, -1.0 * factor])
+    return np.array(rows), np.array(columns), np.array(values)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--equations_per_word", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        equations_csv_path = os.path.join(directory, 'synthetic_equations.csv')
+        write_synthetic_equations(equations_csv_path, args.words, args.equations_per_word)
+
+        equations = read_equations(equations_csv_path)
+        connected_equations_dict = get_connected_equations(create_dict_from_equations(equations, True))
+        variables = sorted(connected_equations_dict.keys())
+
+        unindexed = min(timeit.repeat(
+            lambda: build_matrix_entries_unindexed(equations_csv_path, variables, connected_equations_dict),
+            number=1, repeat=args.repeat))
+        indexed = min(timeit.repeat(
+            lambda: build_matrix(read_equations(equations_csv_path), variables, connected_equations_dict,
+                                 sparse_format=True),
+            number=1, repeat=args.repeat))
+
+    print("words:", len(variables), "equations:", len(equations))
+    print("variables.index(): %.3fs" % unindexed)
+    print("column mapping:    %.3fs (including reading the csv and building the CSR matrix)" % indexed)
+    print("speedup:           %.1fx" % (unindexed / indexed))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Compares find_links with a shared stem index against re-stemming the vocabulary on every call.
+
+> python3 benchmarks/find_links.py data/happiness177_definitions.csv
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nltk.stem.porter import PorterStemmer
+
+from equation_creation import get_csv_column, build_stem_index, find_links
+
+
+def find_links_unindexed(current_word, definition_word, other_words):
+    # find_links before the stem index was introduced
+    links = []
+    porter_stemmer = PorterStemmer()
+    definition_word_stem = porter_stemmer.stem(definition_word)
+    for other_word in other_words:
+        if other_word == current_word:
+            continue
+        if definition_word_stem == porter_stemmer.stem(other_word):
+            links.append(other_word)
+    return links
+
+
+def find_links_indexed(lookups, words):
+    stem_index = build_stem_index(words)
+    return [find_links(word, definition_word, words, stem_index) for (word, definition_word) in lookups]
+
+
+def get_lookups(definitions_csv_path):
+    """
+    :return: A list of (word, definition word) pairs, one per word in each definition
+    """
+    lookups = []
+    with open(definitions_csv_path, 'r') as csv_file:
+        for row in csv.DictReader(csv_file):
+            definitions = ' '.join([row['WordNet Definition'], row['Wiktionary Definition'], row['Oxford Definition']])
+            for definition_word in re.findall(r"[\w]+", definitions.lower()):
+                lookups.append((row['Word'], definition_word))
+    return lookups
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("definitions_path", nargs='?', default='data/happiness177_definitions.csv')
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    words = get_csv_column('Word', args.definitions_path)
+    words.update({"high_prop": ""})
+    lookups = get_lookups(args.definitions_path)
+
+    stem_index = build_stem_index(words)
+    for (word, definition_word) in lookups:
+        assert find_links(word, definition_word, words, stem_index) == \
+               find_links_unindexed(word, definition_word, words)
+
+    unindexed = min(timeit.repeat(lambda: [find_links_unindexed(w, d, words) for (w, d) in lookups],
+                                  number=1, repeat=args.repeat))
+    indexed = min(timeit.repeat(lambda: find_links_indexed(lookups, words), number=1, repeat=args.repeat))
+    print("words:", len(words), "lookups:", len(lookups))
+    print("unindexed: %.3fs" % unindexed)
+    print("indexed:   %.3fs (including building the index)" % indexed)
+    print("speedup:   %.1fx" % (unindexed / indexed))
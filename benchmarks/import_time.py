@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Measures the startup time of each command line script with --help, and checks that none of them imports
+spacy, nltk, PyDictionary, requests, lxml or scipy just to start.
+
+> python3 benchmarks/import_time.py --limit 0.2
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+SCRIPTS = ['matrix_creation.py', 'wiktionary_dict.py', 'adjective_and_definition_retrieval.py',
+           'equation_creation.py', 'pipeline.py']
+HEAVY_MODULES = ['spacy', 'nltk', 'PyDictionary', 'requests', 'lxml', 'scipy']
+
+
+def startup_time(command, repeat):
+    """
+    :return: The best wall time in seconds of running command, out of repeat runs.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def heavy_imports(script):
+    """
+    :return: The list of HEAVY_MODULES imported by running script with --help.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', script, '--help'], cwd=root,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    imported = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith('import time:') and '|' in line:
+            imported.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return [module for module in HEAVY_MODULES if module in imported]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", help="Maximum startup time in seconds", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    interpreter = startup_time([sys.executable, '-c', 'pass'], args.repeat)
+    print("%-48s %8.3fs" % ("python -c pass", interpreter))
+
+    failed = False
+    for script in SCRIPTS:
+        seconds = startup_time([sys.executable, script, '--help'], args.repeat)
+        heavy = heavy_imports(script)
+        print("%-48s %8.3fs %s" % (script + " --help", seconds, ("imports " + ", ".join(heavy)) if heavy else ""))
+        if seconds > args.limit or heavy:
+            failed = True
+
+    if failed:
+        print("Startup is over %.3fs or imports heavy modules" % args.limit)
+        sys.exit(1)
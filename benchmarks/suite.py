@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the offline stages (matrix creation and the Schulze method) on the shipped data and on synthetic inputs,
+and compares the timings against a saved baseline.
+The baseline is machine specific and not committed, record one with --save before comparing.
+
+> python3 benchmarks/suite.py --save                   # record benchmarks/baseline.json
+> python3 benchmarks/suite.py                          # compare against it, exits with 1 on a regression
+> python3 benchmarks/suite.py --sizes 1000 --only matrix
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'schulze_method'))
+
+import numpy as np
+
+from build_matrix import write_synthetic_equations
+from matrix_creation import (read_equations, create_dict_from_equations, create_dict_from_equations_file,
+                             get_connected_equations, build_matrix, order_adjectives)
+from schulze import preference_matrix, strongest_paths_matrix, schulze_method
+
+DATA_DIR = os.path.join(root, 'data')
+EQUATIONS_FILES = ['temperature_equations.csv', 'happiness177_equations.csv', 'quality_equations.csv']
+RANKINGS_FILE = 'happiness_rankings.csv'
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Largest synthetic vocabulary solved with the dense solver, above it lsqr is used
+DENSE_SOLVER_LIMIT = 2000
+SYNTHETIC_VOTERS = 50
+
+
+def equations_cases(name, equations_csv_path, solver='dense', write_equations=None):
+    """
+    :param write_equations: Optional function creating equations_csv_path, only called if one of the cases runs.
+    :return: A list of (case name, setup) tuples for the matrix creation stages on one file. Each setup returns
+    (number of items, function), reading the file on first use so that cases filtered out never read or create it.
+    """
+    @functools.lru_cache(maxsize=None)
+    def load():
+        if write_equations is not None:
+            write_equations()
+        equations = read_equations(equations_csv_path)
+        all_equations_dict = create_dict_from_equations(equations, True)
+        connected_equations_dict = get_connected_equations(all_equations_dict)
+        return equations, all_equations_dict, connected_equations_dict, sorted(connected_equations_dict.keys())
+
+    def create_dict_case():
+        (equations, _, _, _) = load()
+        return len(equations), lambda: create_dict_from_equations_file(equations_csv_path, True)
+
+    def connected_equations_case():
+        (_, all_equations_dict, _, _) = load()
+        return len(all_equations_dict), lambda: get_connected_equations(all_equations_dict)
+
+    def build_matrix_case():
+        (equations, _, connected_equations_dict, variables) = load()
+        return len(equations), lambda: build_matrix(equations, variables, connected_equations_dict,
+                                                    sparse_format=solver != 'dense')
+
+    def order_adjectives_case():
+        (equations, _, _, variables) = load()
+        return len(variables), lambda: order_adjectives(name, equations_csv_path, None, False, solver,
+                                                        equations=equations)
+
+    return [
+        ('matrix/' + name + '/create_dict_from_equations_file', create_dict_case),
+        ('matrix/' + name + '/get_connected_equations', connected_equations_case),
+        ('matrix/' + name + '/build_matrix', build_matrix_case),
+        ('matrix/' + name + '/order_adjectives_' + solver, order_adjectives_case),
+    ]
+
+
+def rankings_cases(name, load_rankings):
+    """
+    :param load_rankings: Function returning (ranks, headers), only called if one of the cases runs.
+    :return: A list of (case name, setup) tuples for the Schulze stages on one set of rankings, like equations_cases.
+    """
+    load = functools.lru_cache(maxsize=None)(load_rankings)
+
+    def setup(function):
+        (ranks, headers) = load()
+        # candidate pairs compared by every voter
+        return len(ranks) * len(headers) ** 2, lambda: function(ranks, headers)
+
+    return [
+        ('schulze/' + name + '/preference_matrix', lambda: setup(lambda ranks, headers: preference_matrix(ranks))),
+        ('schulze/' + name + '/strongest_paths_matrix',
+         lambda: setup(lambda ranks, headers: strongest_paths_matrix(ranks))),
+        ('schulze/' + name + '/schulze_method', lambda: setup(schulze_method)),
+    ]
+
+
+def read_rankings(rankings_csv_path):
+    ranks = np.genfromtxt(rankings_csv_path, dtype=int, delimiter=',', names=True, comments='#')
+    return ranks, ranks.dtype.names
+
+
+def synthetic_rankings(num_candidates, num_voters, seed=0):
+    rng = np.random.RandomState(seed)
+    ranks = np.array([rng.permutation(num_candidates) + 1 for _ in range(num_voters)])
+    return ranks, ["candidate" + str(i) for i in range(num_candidates)]
+
+
+def benchmark_cases(directory, sizes, schulze_sizes):
+    """
+    :param directory: Directory the synthetic equations files are written to, when their cases run.
+    :return: A list of (case name, setup) tuples, see equations_cases.
+    """
+    cases = []
+    for equations_file in EQUATIONS_FILES:
+        cases.extend(equations_cases(equations_file.replace('_equations.csv', ''),
+                                     os.path.join(DATA_DIR, equations_file)))
+    cases.extend(rankings_cases(RANKINGS_FILE.replace('.csv', ''),
+                                functools.partial(read_rankings, os.path.join(DATA_DIR, RANKINGS_FILE))))
+
+    for size in sizes:
+        equations_csv_path = os.path.join(directory, 'synthetic%d_equations.csv' % size)
+        cases.extend(equations_cases('synthetic%d' % size, equations_csv_path,
+                                     'dense' if size <= DENSE_SOLVER_LIMIT else 'lsqr',
+                                     functools.partial(write_synthetic_equations, equations_csv_path, size, 3)))
+    for size in schulze_sizes:
+        cases.extend(rankings_cases('synthetic%d' % size,
+                                    functools.partial(synthetic_rankings, size, SYNTHETIC_VOTERS)))
+    return cases
+
+
+def run_case(function, items, repeat):
+    """
+    Times function, taking the best of repeat runs, then runs it once more under tracemalloc for its peak memory.
+    :return: A dictionary with the seconds, items per second and peak allocated megabytes.
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': seconds, 'items_per_second': items / seconds if seconds else float('inf'),
+            'peak_mb': peak / (1024 * 1024)}
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    :param tolerance: Allowed relative slowdown or memory growth, i.e. 0.2 for 20%.
+    :return: A list of messages, one per case that got slower or uses more memory than its baseline.
+    """
+    regressions = []
+    for (name, result) in results.items():
+        if name not in baseline:
+            continue
+        for metric in ['seconds', 'peak_mb']:
+            before = baseline[name][metric]
+            after = result[metric]
+            if before > 0 and after > before * (1 + tolerance):
+                regressions.append("%s: %s %.4g -> %.4g (+%.0f%%)"
+                                   % (name, metric, before, after, 100 * (after / before - 1)))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs='*', default=[1000, 10000, 100000],
+                        help="Numbers of words in the synthetic equations files")
+    parser.add_argument("--schulze_sizes", type=int, nargs='*', default=[100, 1000],
+                        help="Numbers of candidates in the synthetic rankings")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="Only run the cases whose name contains this string", type=str)
+    parser.add_argument("--baseline", help="Path to the baseline json", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", help="Save the results as the new baseline instead of comparing",
+                        action='store_true')
+    parser.add_argument("--tolerance", help="Allowed relative slowdown before flagging a regression", type=float,
+                        default=0.25)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for (name, setup) in benchmark_cases(directory, args.sizes, args.schulze_sizes):
+            # filtered before setup, so skipped cases don't generate or read their inputs
+            if args.only is not None and args.only not in name:
+                continue
+            (items, function) = setup()
+            results[name] = run_case(function, items, args.repeat)
+            print("%-60s %10.4fs %14.0f/s %9.1f MB" % (name, results[name]['seconds'],
+                                                        results[name]['items_per_second'], results[name]['peak_mb']))
+
+    if args.save:
+        with open(args.baseline, 'w') as json_file:
+            json.dump({'machine': platform.platform(), 'python': platform.python_version(),
+                       'numpy': np.__version__, 'results': results}, json_file, indent=2, sort_keys=True)
+        print("Saved baseline to", args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as json_file:
+            regressions = find_regressions(results, json.load(json_file)['results'], args.tolerance)
+        if regressions:
+            print("Regressions against", args.baseline)
+            print("\n".join(regressions))
+            sys.exit(1)
+        print("No regressions against", args.baseline)
+    else:
+        print("No baseline at", args.baseline + ", run with --save to record one")
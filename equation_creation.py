@@ -2,15 +2,24 @@
 
 import collections
 import csv
+import json
+import os
 import re
 import sys
 import argparse
+import functools
 
-import spacy
-from nltk.stem.porter import PorterStemmer
-from PyDictionary import PyDictionary
+from lexicons import intensifiers, downtoners, adj_intensity_map
+import nlp_models
+from nlp_models import UNUSED_PIPES
+import parse_cache
+import profiling
+import records
+import wordnet_cache
+from records import EquationRow
 
-from score import intensifiers, downtoners, adj_intensity_map
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_SYNONYMS_CACHE = os.getenv('SYNONYMS_CACHE', 'synonyms_cache.json')
 
 def get_csv_column(column_name, csv_file_path):
     """
@@ -27,49 +36,169 @@ def get_csv_column(column_name, csv_file_path):
     return variables
 
 
-def create_equations(attribute, equations_csv_path, definitions_csv_path, nlp=None):
+def get_pydictionary_synonyms(attribute):
+    """
+    Looks up an attribute's synonyms online with PyDictionary.
+    :return: A list of strings, or None if the lookup failed, i.e. without a network connection.
+    """
+    from PyDictionary import PyDictionary
+    return PyDictionary().synonym(attribute)
+
+
+def get_wordnet_synonyms(attribute):
+    """
+    Looks up an attribute's synonyms offline from the lemmas of its WordNet noun synsets.
+    :return: A list of strings.
+    """
+    synonyms = []
+    for synset in wordnet_cache.synsets(attribute, wordnet_cache.NOUN):
+        for lemma_name in wordnet_cache.lemma_names(synset):
+            if lemma_name != attribute and lemma_name not in synonyms:
+                synonyms.append(lemma_name)
+    return synonyms
+
+
+synonym_providers = {'pydictionary': get_pydictionary_synonyms, 'wordnet': get_wordnet_synonyms}
+
+
+def read_synonyms_cache(cache_path):
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, 'r') as cache_file:
+        return json.load(cache_file)
+
+
+def merge_synonyms_cache(entries, cache_path=DEFAULT_SYNONYMS_CACHE):
+    """
+    Adds entries to the json cache file, i.e. the lookups made by pipeline workers.
+    Only one process should merge at a time, since the file is read, updated and replaced as a whole.
+    :param entries: A dictionary mapping "provider:attribute" keys to lists of synonyms.
+    """
+    if cache_path is None or not entries:
+        return
+    cache = read_synonyms_cache(cache_path)
+    cache.update(entries)
+    # write then rename so concurrent readers never see a partially written cache
+    temp_path = cache_path + '.' + str(os.getpid())
+    with open(temp_path, 'w') as cache_file:
+        json.dump(cache, cache_file, indent=1, sort_keys=True)
+    os.replace(temp_path, cache_path)
+
+
+@profiling.counted
+def get_synonyms(attribute, provider='pydictionary', cache_path=DEFAULT_SYNONYMS_CACHE, new_entries=None):
+    """
+    Retrieves an attribute's synonyms, memoized in a json file so each attribute is only looked up once per provider.
+    :param attribute: A string containing an attribute i.e. "temperature"
+    :param provider: A key of synonym_providers
+    :param cache_path: Path to the json cache file. None disables the cache.
+    :param new_entries: Optional dictionary. If given, a new lookup is added to it instead of being written to
+    cache_path, so that a parent process can merge the lookups of its workers with merge_synonyms_cache.
+    :return: A list of strings, in the provider's order. Empty if the lookup failed, in which case it's retried on
+    the next run.
+    """
+    cache = read_synonyms_cache(cache_path)
+    key = provider + ':' + attribute
+    if key in cache:
+        return cache[key]
+    synonyms = synonym_providers[provider](attribute)
+    if synonyms is None:
+        # don't remember a failed lookup, or the attribute would never get its synonyms
+        return []
+    if new_entries is not None:
+        new_entries[key] = synonyms
+    else:
+        merge_synonyms_cache({key: synonyms}, cache_path)
+    return synonyms
+
+
+def get_equation_rows(attribute, definitions, nlp=None, batch_size=DEFAULT_BATCH_SIZE, n_process=1, synonyms=None,
+                      doc_cache=None):
     """
     Converts an attribute's adjectives and their definitions to equations
     :param attribute: A string containing an attribute i.e. "temperature"
-    :param equations_csv_path: A string containing a path to a csv file for the equations
-    :param definitions_csv_path: A string containing a path to a csv file with the adjectives and definitions
-    :param nlp: spacy object. Optional and will be initialized if not given.
-    :return:
+    :param definitions: A list of records.DefinitionRow with the adjectives and definitions
+    :param nlp: spacy object. Optional, defaults to the shared model from nlp_models.get_model.
+    :param batch_size: Number of definitions spacy parses per batch
+    :param n_process: Number of processes spacy parses with
+    :param synonyms: A list of the attribute's synonyms. Optional and will be looked up with get_synonyms if not given.
+    :param doc_cache: Optional parse_cache.ParseCache. Definitions already parsed in an earlier run aren't reparsed.
+    :return: A list of records.EquationRow, in the order they are written to `attribute`_equations.csv
     """
-    if nlp is None:
-        nlp = spacy.load("en")
+    if doc_cache is not None:
+        nlp = doc_cache.nlp
+    elif nlp is None:
+        with profiling.stage('spacy_load'):
+            nlp = nlp_models.get_model()
+    if synonyms is None:
+        with profiling.stage('synonyms'):
+            synonyms = get_synonyms(attribute)
 
-    words = get_csv_column('Word', definitions_csv_path)
+    words = collections.OrderedDict((row.word, "") for row in definitions)
     words.update({"high_prop": ""})
+    stem_index = build_stem_index(words)
 
-    with open(equations_csv_path, 'w') as equations_file, open(definitions_csv_path, 'r') as definitions_file:
-        fieldnames = ['Word', 'Variable', 'Factor', 'Definition', "Deduced"]
-        writer = csv.DictWriter(equations_file, fieldnames=fieldnames)
-        writer.writeheader()
+    # Collect every (word, definition) pair up front so spacy can parse them in batches
+    word_definitions = []
+    for row in definitions:
+        split_definitions = []
+        split_definitions.extend((row.wordnet_definition or "").lower().split(';'))
+        split_definitions.extend((row.wiktionary_definition or "").lower().split(';'))
+        split_definitions.extend((row.oxford_definition or "").lower().split(';'))
+        for definition in split_definitions:
+            word_definitions.append((row.word, combine_words(definition, "not", "quite")))
 
-        reader = csv.DictReader(definitions_file)
-        for row in reader:
-            definitions = []
-            definitions.extend(row['WordNet Definition'].lower().split(';'))
-            definitions.extend(row['Wiktionary Definition'].lower().split(';'))
-            definitions.extend(row['Oxford Definition'].lower().split(';'))
-            word = row['Word']
-            for definition in definitions:
-                definition = combine_words(definition, "not", "quite")
-                doc = nlp(definition)
-                noun_scores = get_noun_scores(doc, attribute)
-                adj_adv_scores = get_adj_adv_scores(word, doc, attribute, words)
-
-                for score in noun_scores:
-                    writer.writerow({'Word': word, 'Variable': 'high_prop', 'Factor': str(score),
-                                     'Definition': definition})
-                    writer.writerow({'Word': "high_prop", 'Variable': word, 'Factor': str(1.0 / score),
-                                     'Definition': definition, 'Deduced': 'Yes'})
-                for (a, score) in adj_adv_scores:
-                    writer.writerow({'Word': word, 'Variable': a, 'Factor': str(score),
-                                     'Definition': definition})
-                    writer.writerow({'Word': a, 'Variable': word, 'Factor': str(1.0 / score),
-                                     'Definition': definition, 'Deduced': 'Yes'})
+    disable = [name for name in UNUSED_PIPES if name in nlp.pipe_names]
+    texts = (definition for (_, definition) in word_definitions)
+    with profiling.stage('spacy_parse'):
+        if doc_cache is not None:
+            docs = doc_cache.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable)
+        elif profiling.enabled:
+            # parse everything up front so the parse time isn't mixed in with the scoring below
+            docs = list(nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable))
+        else:
+            docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable)
+    profiling.count('nlp_docs', len(word_definitions))
+
+    equations = []
+    for ((word, definition), doc) in zip(word_definitions, docs):
+        noun_scores = get_noun_scores(doc, attribute, synonyms)
+        adj_adv_scores = get_adj_adv_scores(word, doc, attribute, words, stem_index)
+
+        for score in noun_scores:
+            equations.append(EquationRow(word, 'high_prop', score, definition, False))
+            equations.append(EquationRow("high_prop", word, 1.0 / score, definition, True))
+        for (a, score) in adj_adv_scores:
+            equations.append(EquationRow(word, a, score, definition, False))
+            equations.append(EquationRow(a, word, 1.0 / score, definition, True))
+    return equations
+
+
+def create_equations(attribute, equations_csv_path, definitions_csv_path, nlp=None, batch_size=DEFAULT_BATCH_SIZE,
+                     n_process=1, synonyms=None, definitions=None, write_csv=True, doc_cache=None):
+    """
+    Converts an attribute's adjectives and their definitions to equations
+    :param attribute: A string containing an attribute i.e. "temperature"
+    :param equations_csv_path: A string containing a path to a csv file for the equations
+    :param definitions_csv_path: A string containing a path to a csv file with the adjectives and definitions
+    :param nlp: spacy object. Optional, defaults to the shared model from nlp_models.get_model.
+    :param batch_size: Number of definitions spacy parses per batch
+    :param n_process: Number of processes spacy parses with
+    :param synonyms: A list of the attribute's synonyms. Optional and will be looked up with get_synonyms if not given.
+    :param definitions: Optional list of records.DefinitionRow to use instead of reading definitions_csv_path
+    :param write_csv: If false, only returns the equations without writing the csv file
+    :param doc_cache: Optional parse_cache.ParseCache. Definitions already parsed in an earlier run aren't reparsed.
+    :return: A list of records.EquationRow
+    """
+    if definitions is None:
+        with profiling.stage('read_definitions'):
+            definitions = records.read_definitions(definitions_csv_path)
+    with profiling.stage('create_equations'):
+        equations = get_equation_rows(attribute, definitions, nlp, batch_size, n_process, synonyms, doc_cache)
+    if write_csv:
+        with profiling.stage('write_equations'):
+            records.write_equations(equations, equations_csv_path)
+    return equations
 
 
 def combine_words(text, a, b):
@@ -95,9 +224,16 @@ def combine_words(text, a, b):
     return " ".join(new_text)
 
 
-def get_noun_scores(doc, attribute):
-    dictionary = PyDictionary()
-    synonyms = dictionary.synonym(attribute)
+def get_noun_scores(doc, attribute, synonyms=None):
+    """
+    :param doc: A spacy doc of a definition
+    :param attribute: A string containing an attribute i.e. "temperature"
+    :param synonyms: A list of the attribute's synonyms. Looked up with get_synonyms if not given.
+    When the noun isn't found as is in the definition, the first synonym in this list that is found is scored.
+    :return: A list of scores for the attribute's (and its synonyms') mentions in the definition
+    """
+    if synonyms is None:
+        synonyms = get_synonyms(attribute)
     scores = []
     for token in doc:
         if token.tag_ == "NN" and (token.text == attribute or token.text in synonyms):
@@ -135,7 +271,9 @@ def get_noun_scores(doc, attribute):
     return scores
 
 
-def get_adj_adv_scores(current_word, doc, attribute, other_words):
+def get_adj_adv_scores(current_word, doc, attribute, other_words, stem_index=None):
+    if stem_index is None:
+        stem_index = build_stem_index(other_words)
     scores = []
     definition_array = re.findall(r"[\w]+", doc.text)
     for token in doc:
@@ -149,7 +287,7 @@ def get_adj_adv_scores(current_word, doc, attribute, other_words):
                 word = token.text[:-2]
             elif token.tag_ == "JJS" and token.text.endswith("est"):
                 word = token.text[:-3]
-            matches = find_links(current_word, word, other_words)
+            matches = find_links(current_word, word, other_words, stem_index)
             if matches is not None:
                 found_adverb = False
                 for child in token.children:
@@ -189,25 +327,40 @@ def get_adj_adv_scores(current_word, doc, attribute, other_words):
     return scores
 
 
-def find_links(current_word, definition_word, other_words):
+@functools.lru_cache(maxsize=1)
+def get_porter_stemmer():
+    from nltk.stem.porter import PorterStemmer
+    return PorterStemmer()
+
+
+def build_stem_index(words):
+    """
+    Groups words by their PorterStemmer stem so find_links can match a definition word with a single lookup
+    :param words: An iterable of strings
+    :return: A dictionary mapping each stem to the list of words with that stem, in their original order
+    """
+    porter_stemmer = get_porter_stemmer()
+    stem_index = {}
+    for word in words:
+        stem_index.setdefault(porter_stemmer.stem(word), []).append(word)
+    return stem_index
+
+
+@profiling.counted
+def find_links(current_word, definition_word, other_words, stem_index=None):
     """
     Finds words in current word's definition that are in the list of other words
     Uses word stems with PorterStemmer so that word's with the same stem still "match"
     :param current_word: A string containing word
     :param definition_word: A string containing the definition of current_word
     :param other_words: A list of strings
+    :param stem_index: The result of build_stem_index(other_words). Built on the fly if not given.
     :return: A list of strings from other_words that "match" words in the definition
     """
-    links = []
-    porter_stemmer = PorterStemmer()
-    definition_word_stem = porter_stemmer.stem(definition_word)
-    for other_word in other_words:
-        if other_word == current_word:
-            continue
-        other_word_stem = porter_stemmer.stem(other_word)
-        if definition_word_stem == other_word_stem:
-            links.append(other_word)
-    return links
+    if stem_index is None:
+        stem_index = build_stem_index(other_words)
+    matches = stem_index.get(get_porter_stemmer().stem(definition_word), [])
+    return [other_word for other_word in matches if other_word != current_word]
 
 
 if __name__ == '__main__':
@@ -222,6 +375,12 @@ if __name__ == '__main__':
         Expected csv header: Source,Relation,Word,WordNet Definition,Wiktionary Definition,Oxford Definition
         """)
     parser.add_argument("--output", help="Output path for the equations csv file. Defaults to `input_term`_equations.csv", type=str)
+    parser.add_argument("--batch_size", help="Number of definitions spacy parses per batch", type=int,
+                        default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--n_process", help="Number of processes spacy parses with", type=int, default=1)
+    parser.add_argument("--synonyms", help="Where to look up the attribute's synonyms. `wordnet` works offline",
+                        choices=sorted(synonym_providers), default='pydictionary')
+    parser.add_argument("--doc_cache", help="Path to a cache of spacy parses, reused across runs", type=str)
     args = parser.parse_args()
 
     definitions_path = args.definitions_path
@@ -230,4 +389,9 @@ if __name__ == '__main__':
     else:
         equations_path = args.input_term + "_equations.csv"
 
-    create_equations(args.input_term, equations_path, definitions_path)
+    cache = None
+    if args.doc_cache:
+        cache = parse_cache.ParseCache(nlp_models.get_model(), args.doc_cache)
+    create_equations(args.input_term, equations_path, definitions_path, batch_size=args.batch_size,
+                     n_process=args.n_process, synonyms=get_synonyms(args.input_term, args.synonyms),
+                     doc_cache=cache)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Intensity lexicons shared by score.py and equation_creation.py.
+Kept free of any NLP dependency so that importing them is cheap.
+"""
+
+high = 1.0
+low = -1.0
+A = 1.4
+A2 = 1.2
+B = 0.8
+B2 = 0.6
+
+# adverbs that increases the intensity of the word
+intensifiers = {"extremely": A, "intensely": A, "exceptionally": A, "astoundingly": A, "excessively": A,
+                "totally": A, "absolutely": A, "completely": A, "oppressively": A, "incredibly": A, "remarkably": A,
+                "particularly": A, "unusually": A, "amazingly": A, "unbearably": A, "utterly": A, "dangerously": A,
+                "extraordinarily": A, "really": A, "very": A, "highly": A}
+
+# adverbs that decrease the intensity of the word
+downtoners = {"fairly": B, "pretty": B, "quite": B, "rather": B, "moderately": B, "somewhat": B,
+              "reasonably": B2, "slightly": B2, "a little": B2, "mildly": B2, "a bit": B2,
+              "pleasantly": B2, "not_quite": -0.6}
+
+# not quite gets parsed incorrectly by spacy so manual conversion to not_quite is necessary
+
+adj_intensity_map = {"high": high, "good": high, "great": high, "higher": high, "better": high, "greater": high,
+                     "low": low, "bad": low, "little": low, "lower": low, "worse": low}
+
+
+class LexiconMatcher:
+    """
+    Finds every occurrence of the entries of several lexicons in a list of tokens in a single scan.
+    Entries can span several tokens, i.e. "a little".
+    """
+
+    def __init__(self, lexicons):
+        """
+        :param lexicons: A dictionary mapping a lexicon name to a dictionary whose keys are its entries.
+        """
+        self.names = list(lexicons)
+        # token trie, where the None key holds the (lexicon name, entry) pairs ending at that node
+        self.trie = {}
+        for (name, lexicon) in lexicons.items():
+            for entry in lexicon:
+                node = self.trie
+                for token in entry.split():
+                    node = node.setdefault(token, {})
+                node.setdefault(None, []).append((name, entry))
+
+    def find(self, tokens):
+        """
+        :param tokens: A list of strings.
+        :return: A dictionary mapping each lexicon name to a dictionary mapping each entry found to the list of
+        indices of the token right after each of its occurrences.
+        """
+        matches = {name: {} for name in self.names}
+        for start in range(len(tokens)):
+            node = self.trie
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                for (name, entry) in node.get(None, ()):
+                    matches[name].setdefault(entry, []).append(end + 1)
+        return matches
+
+
+lexicon_matcher = LexiconMatcher({'adjectives': adj_intensity_map, 'intensifiers': intensifiers,
+                                  'downtoners': downtoners})
@@ -2,118 +2,261 @@
 
 import csv
 from collections import deque
+import os
 import sys
 import argparse
 
 import numpy as np
 
+import profiling
+from records import read_equations
 
-def get_connected_equations(word_equations_dict):
+# least squares solvers for order_adjectives; dense uses numpy, the others work on a sparse matrix
+SOLVERS = ['dense', 'lsqr', 'lsmr']
+
+
+def get_component(word_equations_dict, word, visited=None):
     """
-    Uses a bfs method to find the connected variables in the dictionary.
+    Uses a bfs method to find the words connected to word through their equations.
     :param word_equations_dict: A dictionary mapping each word to a dictionary mapping variables to their factors.
-    :return:
+    :param word: The word to start from. Must be in word_equations_dict.
+    :param visited: Optional set of words already assigned to a component. The words found are added to it.
+    :return: A list of the words in word's component, in bfs order starting with word.
     """
-    temp_dict = dict(word_equations_dict)
-    connected_word_equations_dict = {}
-    queue = deque(["high_prop"])
+    if visited is None:
+        visited = set()
+    visited.add(word)
+    component = []
+    queue = deque([word])
     while queue:
         top = queue.popleft()
-        try:
-            connected_word_equations_dict.update({top: temp_dict[top]})
-        except KeyError:
-            sys.exit("high_prop is not in equations csv")
-        connected_words = list(temp_dict[top].keys())
-        temp_dict.pop(top)
-        for word in connected_words:
-            if word in temp_dict and word not in queue:
-                queue.append(word)
-    return connected_word_equations_dict
+        component.append(top)
+        for variable in word_equations_dict[top]:
+            if variable in word_equations_dict and variable not in visited:
+                visited.add(variable)
+                queue.append(variable)
+    return component
 
 
-def create_dict_from_equations_file(equations_csv_path, include_deduced):
+def get_components(word_equations_dict, visited=None):
+    """
+    Splits the words into connected components. No equation relates words of different components.
+    :param word_equations_dict: A dictionary mapping each word to a dictionary mapping variables to their factors.
+    :param visited: Optional set of words to leave out, i.e. the component of high_prop.
+    :return: A list of components, each a list of words.
+    """
+    if visited is None:
+        visited = set()
+    components = []
+    for word in word_equations_dict:
+        if word not in visited:
+            components.append(get_component(word_equations_dict, word, visited))
+    return components
+
+
+def get_connected_equations(word_equations_dict):
+    """
+    Finds the words connected to the variable high_prop.
+    :param word_equations_dict: A dictionary mapping each word to a dictionary mapping variables to their factors.
+    :return: The entries of word_equations_dict for the words in high_prop's component.
+    """
+    if "high_prop" not in word_equations_dict:
+        sys.exit("high_prop is not in equations csv")
+    return {word: word_equations_dict[word] for word in get_component(word_equations_dict, "high_prop")}
+
+
+def write_disconnected_words(components, disconnected_path):
+    """
+    Writes the words that aren't connected to high_prop, grouped by component from the largest to the smallest.
+    :param components: A list of components from get_components, without high_prop's.
+    """
+    with open(disconnected_path, 'w') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=['Word', 'Component', 'Size'])
+        writer.writeheader()
+        for (i, component) in enumerate(sorted(components, key=len, reverse=True)):
+            for word in sorted(component):
+                writer.writerow({'Word': word, 'Component': i, 'Size': len(component)})
+
+
+def create_dict_from_equations(equations, include_deduced):
     """
     Creates a dictionary mapping each word to a dictionary mapping variables to their factors.
-    :param equations_csv_path: A string with the path to the csv containing the equations
+    :param equations: A list of records.EquationRow, i.e. from read_equations
     :param include_deduced: If true, includes all words. Else, only includes words connected to the variable high_prop.
     :return: A dictionary mapping each word to a dictionary mapping variables to their factors.
     """
     word_equation_dict = {}  # map from word to variable to an int representing the factor
-    with open(equations_csv_path, 'r') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            word = row["Word"]
-            variable = row["Variable"]
-            factor = row["Factor"]
-            deduced = row["Deduced"]
-            if deduced == "Yes" and not include_deduced:
-                continue
-            if word in word_equation_dict:
-                word_equation_dict[word][variable] = float(factor)
-            else:
-                word_equation_dict[word] = {variable: float(factor)}
+    for equation in equations:
+        if equation.deduced and not include_deduced:
+            continue
+        if equation.word in word_equation_dict:
+            word_equation_dict[equation.word][equation.variable] = float(equation.factor)
+        else:
+            word_equation_dict[equation.word] = {equation.variable: float(equation.factor)}
     return word_equation_dict
 
 
-def build_matrix(equations_csv_path, variables, connected_equations_dict):
+def create_dict_from_equations_file(equations_csv_path, include_deduced):
     """
-    Creates a m x n matrix, where m is the number of equations in the equations csv file and n is the number of words.
-    :param equations_csv_path: A string with the path to the csv containing the equations.
+    Creates a dictionary mapping each word to a dictionary mapping variables to their factors.
+    :param equations_csv_path: A string with the path to the csv containing the equations
+    :param include_deduced: If true, includes all words. Else, only includes words connected to the variable high_prop.
+    :return: A dictionary mapping each word to a dictionary mapping variables to their factors.
+    """
+    return create_dict_from_equations(read_equations(equations_csv_path), include_deduced)
+
+
+def get_matrix_entries(equations, columns, connected_equations_dict):
+    """
+    Converts the non-deduced equations of the connected words to matrix entries.
+    Each equation adds 1 to its word's diagonal and -factor to its variable's column, both in its word's row.
+    :param equations: A list of records.EquationRow, i.e. from read_equations.
+    :param columns: A dictionary mapping each word to its matrix row and column.
+    :param connected_equations_dict: A dictionary mapping each word to a dictionary mapping variables to their factors.
+    :return: (rows, columns, values) numpy arrays. Duplicate positions are meant to be summed.
+    """
+    entries = [(columns[equation.word], columns[equation.variable], float(equation.factor)) for equation in equations
+               if not equation.deduced and equation.word in connected_equations_dict]
+    word_columns = np.fromiter((entry[0] for entry in entries), dtype=np.int64, count=len(entries))
+    variable_columns = np.fromiter((entry[1] for entry in entries), dtype=np.int64, count=len(entries))
+    factors = np.fromiter((entry[2] for entry in entries), dtype=float, count=len(entries))
+    rows = np.concatenate([word_columns, word_columns])
+    entry_columns = np.concatenate([word_columns, variable_columns])
+    values = np.concatenate([np.ones(len(entries)), -1.0 * factors])
+    return rows, entry_columns, values
+
+
+def build_matrix(equations, variables, connected_equations_dict, sparse_format=False):
+    """
+    Creates a n x n matrix, where n is the number of words. Each row sums the equations of one word.
+    :param equations: A list of records.EquationRow, i.e. from read_equations, or the path to the equations csv
+    as in earlier versions, which is read once.
     :param variables: A list of the words that correspond to the matrix columns.
     :param connected_equations_dict: A dictionary mapping each word to a dictionary mapping variables to their factors.
     All the entries in this parameter are interconnected.
-    :return: A m x n matrix.
+    :param sparse_format: If true, returns a scipy CSR matrix instead of a list of lists.
+    :return: A n x n matrix.
     """
+    if isinstance(equations, (str, os.PathLike)):
+        equations = read_equations(equations)
+    if sparse_format:
+        return build_sparse_matrix(equations, variables, connected_equations_dict)
+
+    columns = {variable: i for (i, variable) in enumerate(variables)}
     size = len(variables)
     matrix = [[0] * size for i in range(size)]
-    with open(equations_csv_path, 'r') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            word = row["Word"]
-            variable = row["Variable"]
-            factor = float(row["Factor"])
-            deduced = row["Deduced"]
-            if deduced != "Yes" and word in connected_equations_dict:
-                matrix[variables.index(word)][variables.index(word)] += 1
-                matrix[variables.index(word)][variables.index(variable)] += -1.0 * factor
-
-        matrix[variables.index("high_prop")][variables.index("high_prop")] = 1
+    for equation in equations:
+        if not equation.deduced and equation.word in connected_equations_dict:
+            i = columns[equation.word]
+            matrix[i][i] += 1
+            matrix[i][columns[equation.variable]] += -1.0 * float(equation.factor)
+
+    matrix[columns["high_prop"]][columns["high_prop"]] = 1
 
     return matrix
 
 
-def order_adjectives(property_name, equations_csv_path, results_path, include_all):
+def build_sparse_matrix(equations, variables, connected_equations_dict):
+    """
+    Same as build_matrix, but assembles the matrix directly in sparse form since each row only has a few nonzeros.
+    :return: A n x n scipy CSR matrix.
+    """
+    columns = {variable: i for (i, variable) in enumerate(variables)}
+    size = len(variables)
+    high_prop = columns["high_prop"]
+    rows, entry_columns, values = get_matrix_entries(equations, columns, connected_equations_dict)
+
+    # high_prop's diagonal is fixed to 1 rather than accumulated
+    keep = (rows != high_prop) | (entry_columns != high_prop)
+    rows = np.append(rows[keep], high_prop)
+    entry_columns = np.append(entry_columns[keep], high_prop)
+    values = np.append(values[keep], 1)
+
+    # duplicate entries are summed on conversion, matching the += in build_matrix
+    # scipy is only imported for the sparse solvers, it roughly doubles the startup time otherwise
+    from scipy import sparse
+    return sparse.coo_matrix((values, (rows, entry_columns)), shape=(size, size)).tocsr()
+
+
+def solve_least_squares(A, b, solver='dense'):
+    """
+    Solves Ax = b in the least squares sense.
+    :param A: A n x n matrix from build_matrix. Must be a sparse matrix unless solver is dense.
+    :param b: A numpy array of length n.
+    :param solver: One of SOLVERS.
+    :return: A numpy array x of length n.
+    """
+    if solver == 'dense':
+        return np.linalg.lstsq(A, b)[0]
+    from scipy.sparse import linalg as sparse_linalg
+    if solver == 'lsqr':
+        return sparse_linalg.lsqr(A, b, atol=1e-10, btol=1e-10)[0]
+    elif solver == 'lsmr':
+        return sparse_linalg.lsmr(A, b, atol=1e-10, btol=1e-10)[0]
+    raise ValueError("Unknown solver: " + solver + ". Expected one of " + ", ".join(SOLVERS))
+
+
+def order_adjectives(property_name, equations_csv_path, results_path, include_all, solver='dense', equations=None,
+                     disconnected_path=None):
     """
     Orders the adjectives using least squares linear regression.
+    Only high_prop's connected component is solved. No equation links the other components to it and their side of
+    the system is all zeros, so their least squares solution is 0 and their size doesn't affect the solving time.
     :param equations_csv_path: A string with the path to the csv containing the equations.
+    :param results_path: Path to the results csv. If None, the results are only returned.
     :param include_all: If true, includes all words. Else, only includes words connected to the variable high_prop.
+    :param solver: One of SOLVERS. lsqr and lsmr solve a sparse matrix, which scales to much larger vocabularies.
+    :param equations: Optional list of records.EquationRow to use instead of reading equations_csv_path.
+    :param disconnected_path: Optional path to a csv listing the words that aren't connected to high_prop.
     :return: A list of (adj, score) tuples in order of ascending score.
     """
-    all_word_equations_dict = create_dict_from_equations_file(equations_csv_path, True)
-    connected_word_equations_dict = get_connected_equations(all_word_equations_dict)
-
-    if include_all:
-        variables = sorted(all_word_equations_dict.keys())
-        equations_dict = all_word_equations_dict
-    else:
-        variables = sorted(connected_word_equations_dict.keys())
-        equations_dict = connected_word_equations_dict
+    if equations is None:
+        with profiling.stage('read_equations'):
+            equations = read_equations(equations_csv_path)
+    with profiling.stage('connected_equations'):
+        all_word_equations_dict = create_dict_from_equations(equations, True)
+        connected_word_equations_dict = get_connected_equations(all_word_equations_dict)
+        if include_all or disconnected_path is not None:
+            disconnected_components = get_components(all_word_equations_dict, set(connected_word_equations_dict))
+    if disconnected_path is not None:
+        write_disconnected_words(disconnected_components, disconnected_path)
 
-    A = build_matrix(equations_csv_path, variables, equations_dict)
+    variables = sorted(connected_word_equations_dict.keys())
+    with profiling.stage('build_matrix'):
+        A = build_matrix(equations, variables, connected_word_equations_dict, sparse_format=solver != 'dense')
 
-    num_rows = len(A)
+    num_rows = A.shape[0] if solver != 'dense' else len(A)
 
     b = [0] * num_rows
     b[variables.index("high_prop")] = 10
     b = np.array(b)
 
     # find the least squares
-    x = np.round(np.linalg.lstsq(A, b)[0], 2)
-    word_score_tuples = list(zip(variables, x))
+    with profiling.stage('solve_' + solver):
+        x = np.round(solve_least_squares(A, b, solver), 2)
+
+    if include_all:
+        scores = dict(zip(variables, x))
+        for component in disconnected_components:
+            scores.update((word, np.float64(0)) for word in component)
+        variables = sorted(all_word_equations_dict.keys())
+        word_score_tuples = [(variable, scores[variable]) for variable in variables]
+    else:
+        word_score_tuples = list(zip(variables, x))
 
     # sort the attributes
     sorted_word_score_tuples = sorted(word_score_tuples, key=lambda tup: tup[1])
 
+    if results_path is None:
+        return sorted_word_score_tuples
+
+    if include_all:
+        # the results csv shows the whole system
+        A = build_matrix(equations, variables, all_word_equations_dict, sparse_format=solver != 'dense')
+        num_rows = len(variables)
+        b = np.zeros(num_rows, dtype=int)
+        b[variables.index("high_prop")] = 10
+
     with open(results_path, 'w') as csvfile:
         A_indices = ['A' + str(i) for i in range(num_rows)]
         fieldnames = A_indices + ['x', 'b', 'results']
@@ -122,7 +265,8 @@ def order_adjectives(property_name, equations_csv_path, results_path, include_al
         variables_header = dict(zip(A_indices, variables))
         writer.writerow(variables_header)
         for i in range(num_rows):
-            map = dict(zip(A_indices, A[i]))
+            A_row = A.getrow(i).toarray()[0] if solver != 'dense' else A[i]
+            map = dict(zip(A_indices, A_row))
             map.update({'x': variables[i], 'b': b[i],
                         'results': (sorted_word_score_tuples[i][0], "%.2f" % sorted_word_score_tuples[i][1])})
             print(map['results'][0], i + 1, map['results'][1], sep=",")
@@ -143,6 +287,10 @@ if __name__ == '__main__':
         Output from `equation_creation.py`
         """)
     parser.add_argument("--output", help="Output path for the equations csv file. Defaults to `input_term`_results.csv", type=str)
+    parser.add_argument("--solver", help="Least squares solver. lsqr and lsmr use a sparse matrix", choices=SOLVERS,
+                        default='dense')
+    parser.add_argument("--disconnected", help="Output path for a csv of the words not connected to high_prop",
+                        type=str)
     args = parser.parse_args()
 
     if args.output is None:
@@ -150,4 +298,5 @@ if __name__ == '__main__':
     else:
         output = args.output
 
-    ordered_adjectives = order_adjectives(args.input_term, args.equations_path, output, False)
+    ordered_adjectives = order_adjectives(args.input_term, args.equations_path, output, False, args.solver,
+                                          disconnected_path=args.disconnected)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Process-wide registry of spacy models, so each model is loaded once and shared by score and equation_creation.
+
+Before forking a pool of worker processes, call preload() in the parent: the workers then inherit the loaded
+model and share its memory copy-on-write instead of each loading their own copy.
+"""
+
+import os
+import threading
+
+DEFAULT_MODEL = os.getenv('SPACY_MODEL', 'en')
+# The equations and scores only use the tagger and dependency parser
+UNUSED_PIPES = ("ner", "textcat")
+
+# (name, disabled pipes) -> loaded model
+models = {}
+lock = threading.Lock()
+
+
+def get_model(name=DEFAULT_MODEL, disable=UNUSED_PIPES):
+    """
+    Loads a spacy model on first use and returns the same object on every later call.
+    :param name: Name or path of the model, defaults to the SPACY_MODEL env variable or "en".
+    :param disable: Names of the pipes not to load.
+    :return: A spacy Language object.
+    """
+    key = (name, tuple(sorted(disable)))
+    with lock:
+        if key not in models:
+            import spacy
+            models[key] = spacy.load(name, disable=list(disable))
+        return models[key]
+
+
+def preload(name=DEFAULT_MODEL, disable=UNUSED_PIPES):
+    """
+    Loads a model ahead of forking worker processes.
+    :return: The loaded model.
+    """
+    return get_model(name, disable)
+
+
+def clear():
+    with lock:
+        models.clear()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = 'oxford_cache.sqlite'
+DEFAULT_TTL = 30 * 24 * 60 * 60  # 30 days, in seconds
+DEFAULT_MAX_ENTRIES = 100000
+# Seconds to wait for another process holding the database lock, i.e. pipeline workers sharing the cache
+SQLITE_TIMEOUT = 60
+
+
+class OxfordCache:
+    """
+    Persistent cache of Oxford API responses keyed on (word, language).
+    Entries older than `ttl` seconds are treated as missing, and once the cache holds more than `max_entries`
+    responses the least recently used ones are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param path: Path to the SQLite file backing the cache. Created if it doesn't exist.
+        :param ttl: Number of seconds a response stays valid. None to never expire.
+        :param max_entries: Maximum number of responses kept. None for no limit.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evicting = True
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=SQLITE_TIMEOUT)
+        with self.connection:
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS response (
+                word TEXT, language TEXT, status INTEGER, body TEXT, created REAL, accessed REAL,
+                PRIMARY KEY (word, language))""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS response_accessed ON response (accessed)")
+
+    def get(self, word, language='en'):
+        """
+        :return: A (status_code, json) tuple for the cached response, or None if missing or expired.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT status, body, created FROM response WHERE word = ? AND language = ?",
+                                          (word, language)).fetchone()
+            if row is None:
+                return None
+            status, body, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self.connection.execute("DELETE FROM response WHERE word = ? AND language = ?", (word, language))
+                return None
+            self.connection.execute("UPDATE response SET accessed = ? WHERE word = ? AND language = ?",
+                                    (now, word, language))
+        return status, json.loads(body) if body else None
+
+    def put(self, word, status, body, language='en'):
+        """
+        Stores a response, evicting the least recently used entries if the cache is full.
+        :param status: The HTTP status code of the response.
+        :param body: The decoded json of the response, or None.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?, ?, ?)",
+                                    (word, language, status, json.dumps(body) if body is not None else None,
+                                     now, now))
+            if self.evicting:
+                self.evict()
+
+    def evict(self, keep=None):
+        """
+        Deletes the least recently used responses beyond `keep`, which defaults to max_entries.
+        Expects the lock to be held.
+        """
+        if keep is None:
+            keep = self.max_entries
+        if keep is not None:
+            self.connection.execute("""DELETE FROM response WHERE rowid IN (
+                SELECT rowid FROM response ORDER BY accessed DESC LIMIT -1 OFFSET ?)""", (keep,))
+
+    @contextlib.contextmanager
+    def deferred_eviction(self):
+        """
+        Stops evicting while a batch of responses is stored, then evicts once, never dropping a response
+        stored or read during the batch even if the batch is larger than max_entries.
+        """
+        start = time.time()
+        self.evicting = False
+        try:
+            yield
+        finally:
+            with self.lock, self.connection:
+                self.evicting = True
+                if self.max_entries is not None:
+                    used = self.connection.execute("SELECT COUNT(*) FROM response WHERE accessed >= ?",
+                                                   (start,)).fetchone()[0]
+                    self.evict(max(self.max_entries, used))
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM response").fetchone()[0]
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM response")
+
+    def close(self):
+        self.connection.close()
+
+
+class MemoryCache:
+    """
+    In-memory stand-in for OxfordCache, used to hold prefetched responses for a single run.
+    """
+
+    def __init__(self):
+        self.responses = {}
+        self.lock = threading.Lock()
+
+    def get(self, word, language='en'):
+        with self.lock:
+            return self.responses.get((word, language))
+
+    def put(self, word, status, body, language='en'):
+        with self.lock:
+            self.responses[(word, language)] = (status, body)
+
+    def __len__(self):
+        return len(self.responses)
+
+    def deferred_eviction(self):
+        return contextlib.nullcontext()
+
+    def clear(self):
+        with self.lock:
+            self.responses.clear()
+
+    def close(self):
+        pass
+
+
+def get_cache(path=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Opens the Oxford response cache, defaulting to the path in the OXFORD_CACHE env variable.
+    :return: An OxfordCache, or None if no path was given and OXFORD_CACHE is unset.
+    """
+    if path is None:
+        path = os.getenv('OXFORD_CACHE')
+        if path is None:
+            return None
+    return OxfordCache(path, ttl, max_entries)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+import profiling
+
+DEFAULT_CACHE_PATH = os.getenv('PARSE_CACHE', 'parse_cache.sqlite')
+# Seconds to wait for another process holding the database lock
+SQLITE_TIMEOUT = 60
+# Keys looked up per SELECT, below SQLite's default limit of 999 variables per statement
+SELECT_BATCH_SIZE = 500
+
+
+class ParseCache:
+    """
+    Persistent cache of spacy parses keyed on a hash of the text and the model that parsed it,
+    so re-running the pipeline on the same definitions skips parsing entirely.
+    Changing the model, its version or its enabled pipes changes the keys, so stale parses are never returned.
+    """
+
+    def __init__(self, nlp, path=DEFAULT_CACHE_PATH):
+        """
+        :param nlp: spacy.load object used to parse cache misses.
+        :param path: Path to the SQLite file backing the cache. Created if it doesn't exist.
+        """
+        self.nlp = nlp
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=SQLITE_TIMEOUT)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS doc (key TEXT PRIMARY KEY, data BLOB)")
+        profiling.register_cache('parse_cache', self.stats)
+
+    def stats(self):
+        return {'docs': {'hits': self.hits, 'misses': self.misses}}
+
+    def model_id(self, disable=()):
+        meta = self.nlp.meta
+        pipes = [name for name in self.nlp.pipe_names if name not in disable]
+        return "%s_%s-%s:%s" % (meta.get('lang'), meta.get('name'), meta.get('version'), ",".join(pipes))
+
+    def key(self, text, model_id):
+        return hashlib.sha256((model_id + "\0" + text).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute("SELECT data FROM doc WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        from spacy.tokens import Doc
+        return Doc(self.nlp.vocab).from_bytes(row[0])
+
+    def get_many(self, keys):
+        """
+        Looks keys up with one SELECT per SELECT_BATCH_SIZE keys instead of one per key.
+        :return: A list with the cached doc of each key, or None where it isn't cached, in the order of keys.
+        """
+        rows = {}
+        distinct = list(set(keys))
+        with self.lock:
+            for start in range(0, len(distinct), SELECT_BATCH_SIZE):
+                batch = distinct[start:start + SELECT_BATCH_SIZE]
+                rows.update(self.connection.execute("SELECT key, data FROM doc WHERE key IN (%s)"
+                                                    % ",".join("?" * len(batch)), batch))
+        from spacy.tokens import Doc
+        # each position gets its own doc, since callers may modify them (i.e. merging noun chunks)
+        return [Doc(self.nlp.vocab).from_bytes(rows[key]) if key in rows else None for key in keys]
+
+    def put(self, key, doc):
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO doc VALUES (?, ?)", (key, doc.to_bytes()))
+
+    def pipe(self, texts, batch_size=256, n_process=1, disable=()):
+        """
+        Same as nlp.pipe, but only parses the texts that aren't cached yet.
+        :return: A list of docs, in the order of texts.
+        """
+        texts = list(texts)
+        model_id = self.model_id(disable)
+        keys = [self.key(text, model_id) for text in texts]
+        docs = self.get_many(keys)
+
+        # parse each distinct missing text once
+        missing = {}
+        for (i, doc) in enumerate(docs):
+            if doc is None:
+                missing.setdefault(texts[i], []).append(i)
+        self.hits += len(texts) - sum(len(indices) for indices in missing.values())
+        self.misses += len(missing)
+
+        from spacy.tokens import Doc
+        parsed = self.nlp.pipe(list(missing), batch_size=batch_size, n_process=n_process, disable=list(disable))
+        for (indices, doc) in zip(missing.values(), parsed):
+            self.put(keys[indices[0]], doc)
+            docs[indices[0]] = doc
+            for i in indices[1:]:
+                # each position gets its own doc, since callers may modify them (i.e. merging noun chunks)
+                docs[i] = Doc(self.nlp.vocab).from_bytes(doc.to_bytes())
+        return docs
+
+    def parse(self, text, disable=()):
+        return self.pipe([text], disable=disable)[0]
+
+    def close(self):
+        self.connection.close()
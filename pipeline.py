@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import gc
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import nlp_models
+import wiktionary_dict
+import oxford_cache
+import profiling
+import wordnet_cache
+from adjective_and_definition_retrieval import retrieve_definitions
+from equation_creation import create_equations, get_synonyms, merge_synonyms_cache, synonym_providers
+from matrix_creation import order_adjectives
+
+STAGES = ['definitions', 'equations', 'results']
+
+# Heavy resources loaded once per worker process by load_resources
+resources = {}
+
+
+def load_resources(wiktionary_path, cache_path=None, offline=False, synonym_provider='pydictionary'):
+    """
+    Loads Wiktionary, spacy and WordNet once so that every attribute run by this process shares them.
+    Used as the initializer of each worker process.
+    """
+    # WordNet and spacy are already loaded in forked workers, when the parent preloaded them
+    wordnet_cache.wordnet().ensure_loaded()
+    resources['wiki'] = wiktionary_dict.open_ontology(wiktionary_path, pos='A')
+    resources['nlp'] = nlp_models.get_model()
+    resources['cache'] = oxford_cache.get_cache(cache_path)
+    resources['offline'] = offline
+    resources['wiktionary_path'] = wiktionary_path
+    resources['synonym_provider'] = synonym_provider
+
+
+def run_attribute(attribute, output_dir='.', see_also=False, write_csv=True):
+    """
+    Runs retrieve_definitions, create_equations and order_adjectives for one attribute,
+    writing `attribute`_definitions.csv, `attribute`_equations.csv and `attribute`_results.csv to output_dir.
+    Each stage's rows are handed to the next in memory, so the csv files are only written, never re-read.
+    Expects load_resources to have been called in this process.
+    :param write_csv: If false, no csv files are written.
+    :return: A dictionary with the attribute, the seconds taken by each stage, the error if one failed, and the
+    synonym lookups under synonym_cache_entries, left for the parent process to write to the shared cache.
+    When profiling is enabled, the profiling report of this attribute is under profile, for the parent to merge.
+    """
+    paths = {stage: os.path.join(output_dir, attribute + '_' + stage + '.csv') for stage in STAGES}
+    report = {'attribute': attribute, 'error': '', 'synonym_cache_entries': {}}
+    # this worker's earlier attributes were already handed to the parent
+    profiling.reset()
+    start = time.perf_counter()
+    try:
+        definitions = retrieve_definitions(attribute, resources['wiktionary_path'], see_also, paths['definitions'],
+                                           cache=resources['cache'], offline=resources['offline'],
+                                           wiki=resources['wiki'], write_csv=write_csv)
+        report['definitions'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        synonyms = get_synonyms(attribute, resources['synonym_provider'],
+                                new_entries=report['synonym_cache_entries'])
+        equations = create_equations(attribute, paths['equations'], paths['definitions'], nlp=resources['nlp'],
+                                     synonyms=synonyms, definitions=definitions, write_csv=write_csv)
+        report['equations'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        order_adjectives(attribute, paths['equations'], paths['results'] if write_csv else None, False,
+                         equations=equations)
+        report['results'] = time.perf_counter() - start
+    except (Exception, SystemExit) as e:
+        # matrix_creation exits when high_prop is missing; record it instead of killing the worker
+        report['error'] = repr(e)
+        traceback.print_exc()
+    if profiling.enabled:
+        report['profile'] = profiling.report()
+    return report
+
+
+def run_pipeline(attributes, wiktionary_path, output_dir='.', processes=None, see_also=False, cache_path=None,
+                 offline=False, synonym_provider='pydictionary', write_csv=True, fork=False):
+    """
+    Runs every stage of the pipeline for each attribute over a pool of worker processes.
+    A failure in one attribute is reported and doesn't stop the others, even if it kills its worker process.
+    The synonyms looked up by the workers are merged into the synonyms cache here, once they have all finished,
+    and so are their stage times and counters into this process's profile.
+    :param attributes: A list of attributes i.e. ["temperature", "speed"].
+    :param wiktionary_path: Path to 2011-08-01_OntoWiktionary_EN.xml.bz2 or a .sqlite index.
+    :param processes: Number of worker processes. Defaults to the number of CPUs.
+    :param fork: If true, spacy and WordNet are loaded here and the workers are forked from this process, sharing
+    their memory instead of each loading a copy. Only on platforms with fork, and not safe with other threads running.
+    :return: A list of reports from run_attribute, in the order of attributes.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    initargs = (wiktionary_path, cache_path, offline, synonym_provider)
+    if fork:
+        nlp_models.preload()
+        wordnet_cache.wordnet().ensure_loaded()
+        context = multiprocessing.get_context('fork')
+    else:
+        # fresh interpreters, whatever the platform's default, since forking a process with threads running isn't safe
+        context = multiprocessing.get_context('spawn')
+    reports = run_in_pool(attributes, processes, context, initargs, output_dir, see_also, write_csv)
+    # a worker that dies breaks the whole pool, so the attributes it took down with it are retried one pool each
+    for (i, report) in enumerate(reports):
+        if report.get('broken_pool'):
+            reports[i] = run_in_pool([report['attribute']], 1, context, initargs, output_dir, see_also, write_csv)[0]
+            reports[i].pop('broken_pool', None)
+
+    synonym_cache_entries = {}
+    for report in reports:
+        synonym_cache_entries.update(report.pop('synonym_cache_entries', {}))
+        if 'profile' in report:
+            profiling.merge(report.pop('profile'))
+    merge_synonyms_cache(synonym_cache_entries)
+    return reports
+
+
+def run_in_pool(attributes, processes, context, initargs, output_dir, see_also, write_csv):
+    """
+    Runs run_attribute for each attribute in a new pool of worker processes.
+    :return: A list of reports in the order of attributes. The reports of attributes lost with a worker process
+    have broken_pool set.
+    """
+    forked = context.get_start_method() == 'fork'
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=load_resources,
+                             initargs=initargs) as executor:
+        if forked:
+            # keeps collections in the workers from writing to the pages of the objects they inherit, so the pages
+            # stay shared. Every worker is forked on the first submit, after that the parent collects them as usual
+            gc.freeze()
+        try:
+            futures = [executor.submit(run_attribute, attribute, output_dir, see_also, write_csv)
+                       for attribute in attributes]
+        finally:
+            if forked:
+                gc.unfreeze()
+        reports = []
+        for (attribute, future) in zip(attributes, futures):
+            try:
+                reports.append(future.result())
+            except BrokenProcessPool as e:
+                print(attribute, "failed in its worker process:", repr(e))
+                reports.append({'attribute': attribute, 'error': repr(e), 'broken_pool': True})
+            except Exception as e:
+                print(attribute, "failed in its worker process:", repr(e))
+                reports.append({'attribute': attribute, 'error': repr(e)})
+    return reports
+
+
+def write_reports(reports, summary_path):
+    with open(summary_path, 'w') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=['attribute'] + STAGES + ['error'])
+        writer.writeheader()
+        for report in reports:
+            writer.writerow(report)
+
+
+if __name__ == '__main__':
+    # example:
+    # > python3 pipeline.py data/OntoWiktionary_EN.sqlite temperature speed quality --output_dir out
+    # creates out/temperature_definitions.csv, out/temperature_equations.csv, out/temperature_results.csv, ...
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("wiktionary", help="Path to 2011-08-01_OntoWiktionary_EN.xml.bz2 or to a .sqlite index")
+    parser.add_argument("attributes", nargs='+', help='Attributes i.e. "temperature speed quality"')
+    parser.add_argument("--output_dir", help="Directory for the csv files. Defaults to the current directory",
+                        default='.')
+    parser.add_argument("--processes", help="Number of worker processes. Defaults to the number of CPUs", type=int)
+    parser.add_argument("--see_also", help="Should the definitions collected include the `see-also` wordnet relation?",
+                        action='store_true')
+    parser.add_argument("--oxford_cache", help="Path to a cache of Oxford API responses", type=str)
+    parser.add_argument("--offline", help="Only use cached Oxford responses, never call the API", action='store_true')
+    parser.add_argument("--synonyms", help="Where to look up each attribute's synonyms. `wordnet` works offline",
+                        choices=sorted(synonym_providers), default='pydictionary')
+    parser.add_argument("--no_csv", help="Don't write the per-attribute csv files, only the summary",
+                        action='store_true')
+    parser.add_argument("--summary", help="Path to a csv with the seconds each stage took per attribute",
+                        default='pipeline_summary.csv')
+    parser.add_argument("--fork", help="Load spaCy and WordNet once and fork the workers, which share their memory. "
+                                       "Not available on Windows", action='store_true')
+    args = parser.parse_args()
+
+    reports = run_pipeline(args.attributes, args.wiktionary, args.output_dir, args.processes, args.see_also,
+                           args.oxford_cache, args.offline, args.synonyms, not args.no_csv, args.fork)
+    write_reports(reports, args.summary)
+    for report in reports:
+        if report['error']:
+            print(report['attribute'], "failed:", report['error'])
+        else:
+            print(report['attribute'], ", ".join("%s %.1fs" % (stage, report[stage]) for stage in STAGES))
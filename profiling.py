@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Opt-in timing and call counting across the pipeline.
+
+Set ADJ_PROFILE to a json path (or "-" for a table on stderr) to enable it for any of the scripts:
+    ADJ_PROFILE=profile.json python matrix_creation.py temperature data/temperature_equations.csv
+The report is written when the main process exits. When disabled, stages and counters do nothing.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+enabled = False
+stage_times = defaultdict(float)
+stage_calls = defaultdict(int)
+counters = defaultdict(int)
+lock = threading.Lock()
+# names of the stages each thread is currently in, innermost last
+stage_stacks = threading.local()
+disabled_stage = nullcontext()
+# functions returning {name: {"hits": int, "misses": int}}, registered by modules with caches
+cache_stat_sources = {}
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    stage_times.clear()
+    stage_calls.clear()
+    counters.clear()
+
+
+def stage(name):
+    """
+    Times the enclosed block under name. Repeated stages with the same name are summed.
+    A stage entered inside another one is recorded under both names joined by "/", i.e. "create_equations/spacy_parse",
+    so the time of the outer stage already includes it and top level stages can be added up.
+    When disabled, returns a shared context manager that does nothing.
+    """
+    if not enabled:
+        return disabled_stage
+    return timed_stage(name)
+
+
+@contextmanager
+def timed_stage(name):
+    stack = getattr(stage_stacks, 'names', None)
+    if stack is None:
+        # each thread nests its own stages
+        stack = stage_stacks.names = []
+    stack.append(name)
+    qualified_name = "/".join(stack)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        stack.pop()
+        with lock:
+            stage_times[qualified_name] += seconds
+            stage_calls[qualified_name] += 1
+
+
+def count(name, amount=1):
+    if enabled:
+        with lock:
+            counters[name] += amount
+
+
+def counted(function):
+    """
+    Decorator counting the calls to a function under its qualified name.
+    When profiling is disabled at decoration time the function is returned unwrapped, so it costs nothing;
+    ADJ_PROFILE enables profiling when this module is imported, before any decorated function is defined.
+    """
+    if not enabled:
+        return function
+    name = function.__module__ + "." + function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        count(name)
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def register_cache(name, stats_function):
+    cache_stat_sources[name] = stats_function
+
+
+def peak_memory_mb():
+    """
+    :return: Peak resident memory of this process in megabytes, or None if unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def report():
+    caches = {}
+    for (source, stats_function) in cache_stat_sources.items():
+        for (name, stats) in stats_function().items():
+            calls = stats['hits'] + stats['misses']
+            caches[source + "." + name] = {'hits': stats['hits'], 'misses': stats['misses'],
+                                           'hit_rate': stats['hits'] / calls if calls else 0.0}
+    return {
+        'stages': {name: {'seconds': stage_times[name], 'calls': stage_calls[name]} for name in stage_times},
+        'counters': dict(counters),
+        'caches': caches,
+        'peak_memory_mb': peak_memory_mb(),
+    }
+
+
+def merge(profile):
+    """
+    Adds the stage times and counters of a report from another process, i.e. a pipeline worker, to this process's.
+    """
+    with lock:
+        for (name, stats) in profile['stages'].items():
+            stage_times[name] += stats['seconds']
+            stage_calls[name] += stats['calls']
+        for (name, value) in profile['counters'].items():
+            counters[name] += value
+
+
+def summary_table(profile=None):
+    if profile is None:
+        profile = report()
+    lines = ["%-40s %10s %8s" % ("stage", "seconds", "calls")]
+    # sorted by name, so nested stages follow the stage they are in
+    for (name, stats) in sorted(profile['stages'].items()):
+        lines.append("%-40s %10.3f %8d" % (name, stats['seconds'], stats['calls']))
+    lines.append("")
+    lines.append("%-40s %10s" % ("counter", "count"))
+    for (name, value) in sorted(profile['counters'].items()):
+        lines.append("%-40s %10d" % (name, value))
+    if profile['caches']:
+        lines.append("")
+        lines.append("%-40s %10s %8s %8s" % ("cache", "hits", "misses", "rate"))
+        for (name, stats) in sorted(profile['caches'].items()):
+            lines.append("%-40s %10d %8d %7.1f%%" % (name, stats['hits'], stats['misses'], 100 * stats['hit_rate']))
+    if profile['peak_memory_mb'] is not None:
+        lines.append("")
+        lines.append("peak memory: %.1f MB" % profile['peak_memory_mb'])
+    return "\n".join(lines)
+
+
+def write_report(path):
+    """
+    Writes the report as json to path, or as a summary table to stderr if path is "-".
+    """
+    if path == '-':
+        print(summary_table(), file=sys.stderr)
+        return
+    with open(path, 'w') as json_file:
+        json.dump(report(), json_file, indent=2, sort_keys=True)
+
+
+def write_main_report(path):
+    """
+    Calls write_report from the main process only. Worker processes return their report to it instead, to be added
+    with merge, so they don't overwrite its file.
+    """
+    import multiprocessing
+    if multiprocessing.parent_process() is None:
+        write_report(path)
+
+
+if os.getenv('ADJ_PROFILE'):
+    enable()
+    atexit.register(write_main_report, os.getenv('ADJ_PROFILE'))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import csv
+from collections import namedtuple
+
+DEFINITION_FIELDNAMES = ['Source', 'Relation', 'Word', 'WordNet Definition', 'Wiktionary Definition',
+                         'Oxford Definition']
+EQUATION_FIELDNAMES = ['Word', 'Variable', 'Factor', 'Definition', 'Deduced']
+# Older definitions files, including most of the ones in data/, misspell the Wiktionary column
+LEGACY_FIELDNAMES = {'Wikitionary Definition': 'Wiktionary Definition'}
+
+
+class DefinitionRow(namedtuple('DefinitionRow', ['source', 'relation', 'word', 'wordnet_definition',
+                                                 'wiktionary_definition', 'oxford_definition'])):
+    """
+    One row of `attribute`_definitions.csv, as produced by adjective_and_definition_retrieval.
+    Definitions that couldn't be retrieved may be empty strings or None.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_csv_row(cls, row):
+        for (legacy_fieldname, fieldname) in LEGACY_FIELDNAMES.items():
+            if legacy_fieldname in row and fieldname not in row:
+                row = dict(row)
+                row[fieldname] = row.pop(legacy_fieldname)
+        return cls(*[row[fieldname] for fieldname in DEFINITION_FIELDNAMES])
+
+    def to_csv_row(self):
+        return dict(zip(DEFINITION_FIELDNAMES, self))
+
+
+class EquationRow(namedtuple('EquationRow', ['word', 'variable', 'factor', 'definition', 'deduced'])):
+    """
+    One row of `attribute`_equations.csv, as produced by equation_creation.
+    factor is a number and deduced is a bool.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_csv_row(cls, row):
+        return cls(row['Word'], row['Variable'], float(row['Factor']), row['Definition'], row['Deduced'] == 'Yes')
+
+    def to_csv_row(self):
+        row = {'Word': self.word, 'Variable': self.variable, 'Factor': str(self.factor), 'Definition': self.definition}
+        if self.deduced:
+            row['Deduced'] = 'Yes'
+        return row
+
+
+class RecordCollector(list):
+    """
+    Stands in for a csv DictWriter, collecting each written row as a record instead.
+    """
+
+    def __init__(self, record_type):
+        super().__init__()
+        self.record_type = record_type
+
+    def writerow(self, row):
+        self.append(self.record_type.from_csv_row(row))
+
+
+def read_records(record_type, csv_path):
+    with open(csv_path, 'r') as csvfile:
+        return [record_type.from_csv_row(row) for row in csv.DictReader(csvfile)]
+
+
+def write_records(records, fieldnames, csv_path):
+    with open(csv_path, 'w') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record.to_csv_row())
+
+
+def read_definitions(definitions_csv_path):
+    """
+    :return: A list of DefinitionRow, one per row of the definitions csv.
+    """
+    return read_records(DefinitionRow, definitions_csv_path)
+
+
+def write_definitions(definitions, definitions_csv_path):
+    write_records(definitions, DEFINITION_FIELDNAMES, definitions_csv_path)
+
+
+def read_equations(equations_csv_path):
+    """
+    :return: A list of EquationRow, one per row of the equations csv.
+    """
+    return read_records(EquationRow, equations_csv_path)
+
+
+def write_equations(equations, equations_csv_path):
+    write_records(equations, EQUATION_FIELDNAMES, equations_csv_path)
@@ -1,21 +1,40 @@
 import numpy as np
+import collections
 import csv
 import operator
 
-def preference_matrix(ranks):
+# Number of voters compared at once in preference_matrix
+PREFERENCE_CHUNK_SIZE = 64
+
+def ranks_to_array(ranks):
+    """Converts ranks to a plain m x c numpy array.
+    Accepts 2-D arrays and lists as well as the structured record array returned by np.genfromtxt(..., names=True)
+    """
+    ranks = np.asarray(ranks)
+    if ranks.dtype.names is not None:
+        return np.column_stack([ranks[name] for name in ranks.dtype.names])
+    return ranks
+
+
+def preference_matrix(ranks, weights=None, chunk_size=PREFERENCE_CHUNK_SIZE):
     """Assume that ranks are m x c, where m is the number of voters and c is the number of candidates.
+    If given, weights is an array of length m with the number of voters that cast each row's ballot.
     Return a matrix of size c x c.
     The value of the array [i][j] is the total count of voters who prefer candidate i over candidate j
+    Voters are compared chunk_size at a time so that memory stays bounded at chunk_size x c x c booleans.
     """
-    c = len(ranks[0])
+    ranks = ranks_to_array(ranks)
+    c = ranks.shape[1]
     prefs = np.zeros((c, c))
 
-    for i in range(c):
-        for j in range(c):
-            for row in ranks:
-                if row[i] < row[j]:
-                    # voter prefers candidate i to candidate j
-                    prefs[i][j] += 1
+    for start in range(0, len(ranks), chunk_size):
+        chunk = ranks[start:start + chunk_size]
+        # voter prefers candidate i to candidate j
+        prefers = chunk[:, :, np.newaxis] < chunk[:, np.newaxis, :]
+        if weights is None:
+            prefs += np.sum(prefers, axis=0)
+        else:
+            prefs += np.tensordot(np.asarray(weights[start:start + chunk_size], dtype=float), prefers, axes=1)
     return prefs
 
 def prefs_string_to_ranks(string):
@@ -32,66 +51,67 @@ def count_pref_format_to_array(file, header=True):
         count, pref
         2, AB
         1, BA
-        to a numpy record array representing the ranks.
-        Return (headers, array of rows)
+        to a numpy array representing the ranks of each distinct ballot, and the number of votes for each.
+        Return (headers, array of rows, array of weights)
+        Earlier versions returned (headers, array of rows) with one row per vote, callers unpacking two values
+        must now unpack the weights too and pass them on, i.e. schulze_method(ranks, headers, weights).
 
         Assumptions: Each vote specifies preferences for all candidates
     """
-    csv_reader = csv.reader(csvfile)
-    row_index = 1
-    rank_rows = []
+    csv_reader = csv.reader(file)
+    if header:
+        next(csv_reader, None)
+    headers = []
+    # Maps each distinct ballot's ranks to its total count
+    ballots = collections.OrderedDict()
     for row in csv_reader:
-        if row_index == 1 and header:
-            # Header row, do nothing
-            pass
-        else:
-            (count, pref_string) = row
-            count = int(count)
-            pref_string = pref_string.strip()
-            rank_dict = prefs_string_to_ranks(pref_string)
-            # Extract the headers and values sorted alphabetically
-            headers = []
-            values = []
-            for (header, value) in sorted(rank_dict.items()):
-                headers.append(header)
-                values.append(value)
-            # Duplicate row for each count
-            for _ in range(count):
-                rank_rows.append(values)
-        row_index += 1
-
-    return headers, np.array(rank_rows)
-
-def strongest_paths_matrix(ranks):
+        (count, pref_string) = row
+        count = int(count)
+        pref_string = pref_string.strip()
+        rank_dict = prefs_string_to_ranks(pref_string)
+        # Extract the headers and values sorted alphabetically
+        headers = []
+        values = []
+        for (candidate, value) in sorted(rank_dict.items()):
+            headers.append(candidate)
+            values.append(value)
+        ballots[tuple(values)] = ballots.get(tuple(values), 0) + count
+
+    return headers, np.array(list(ballots.keys())), np.array(list(ballots.values()), dtype=int)
+
+def strongest_paths_matrix(ranks, weights=None, dtype=int):
     """
     # Input: ranks are m x c, where m is the number of voters and c is the number of candidates.
+    # weights: optional array of length m with the number of voters that cast each row's ballot.
+    # dtype: integer type of the output, i.e. np.int32 or np.int16 to save memory. Must hold the number of voters.
     # Output: strongest_paths[i,j], the strength of the strongest path from candidate i to candidate j.
     """
 
     # prefs[i,j], the number of voters who prefer candidate i to candidate j.
-    prefs = preference_matrix(ranks)
-
-    c = len(prefs[0])
-    strongest_paths = np.zeros((c, c), dtype=int)
-    for i in range(c):
-        for j in range(c):
-            if i != j:
-                if prefs[i][j] > prefs[j][i]:
-                    strongest_paths[i][j] = prefs[i][j]
-                else:
-                    strongest_paths[i][j] = 0
+    return strongest_paths_from_prefs(preference_matrix(ranks, weights), dtype)
 
-    for i in range(c):
-        for j in range(c):
-            if i != j:
-                for k in range(c):
-                    if i != k and j != k:
-                        strongest_paths[j, k] = max(strongest_paths[j, k], min(strongest_paths[j, i], strongest_paths[i, k]))
+def strongest_paths_from_prefs(prefs, dtype=int):
+    """
+    # Input: prefs[i,j], the number of voters who prefer candidate i to candidate j.
+    # Output: strongest_paths[i,j], the strength of the strongest path from candidate i to candidate j.
+    """
+    strongest_paths = np.where(prefs > prefs.T, prefs, 0).astype(dtype)
+    np.fill_diagonal(strongest_paths, 0)
+
+    # Floyd-Warshall widest path, updating the whole matrix for each intermediate candidate i.
+    # Row and column i can't change during step i, so the update doesn't depend on the order within a step.
+    for i in range(len(strongest_paths)):
+        np.maximum(strongest_paths, np.minimum(strongest_paths[:, i:i + 1], strongest_paths[i:i + 1, :]),
+                   out=strongest_paths)
+    np.fill_diagonal(strongest_paths, 0)
     return strongest_paths
 
-def schulze_method(ranks, headers):
-    strongest_paths = strongest_paths_matrix(ranks)
+def schulze_method(ranks, headers, weights=None):
+    return schulze_ranks(strongest_paths_matrix(ranks, weights=weights), headers)
 
+def schulze_ranks(strongest_paths, headers):
+    """Ranks candidates from their strongest paths matrix. Returns a dict mapping each header to its rank, 1 being best.
+    """
     c = len(strongest_paths)
     rankings = np.zeros((c, c), dtype=int)
     for i in range(c):
@@ -110,16 +130,58 @@ def schulze_method(ranks, headers):
 
     return results
 
+class SchulzeAggregator:
+    """Keeps the pairwise preference counts of all rankings seen so far, so new rankings can be merged
+    without re-reading the old ones. Strongest paths are only recomputed when results are requested.
+    """
+
+    def __init__(self, headers, prefs=None):
+        self.headers = list(headers)
+        c = len(self.headers)
+        self.prefs = np.zeros((c, c)) if prefs is None else np.array(prefs, dtype=float)
+        self.strongest_paths = None
+
+    def add_ranking(self, ranking):
+        """Adds one voter's ranks, a sequence of c ranks in the order of headers. O(c^2)
+        """
+        self.add_rankings([ranking])
+
+    def add_rankings(self, ranks, weights=None):
+        """Adds m x c ranks, in the same formats accepted by preference_matrix, optionally weighted per row
+        """
+        ranks = ranks_to_array(ranks)
+        if ranks.shape[1] != len(self.headers):
+            raise ValueError("Expected rankings of %d candidates, got %d" % (len(self.headers), ranks.shape[1]))
+        self.prefs += preference_matrix(ranks, weights)
+        self.strongest_paths = None
+
+    def results(self):
+        """Returns a dict mapping each header to its Schulze rank over all rankings added so far
+        """
+        if self.strongest_paths is None:
+            self.strongest_paths = strongest_paths_from_prefs(self.prefs)
+        return schulze_ranks(self.strongest_paths, self.headers)
+
+    def save(self, path):
+        """Writes the headers and preference counts to a .npz file
+        """
+        np.savez(path, headers=np.array(self.headers), prefs=self.prefs)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls([str(header) for header in data['headers']], data['prefs'])
+
 # TODO: Turn into unit test
 def wikipedia_example():
     with open('./data/wikipedia_example.csv') as csvfile:
-        (headers, ranks) = count_pref_format_to_array(csvfile)
+        (headers, ranks, weights) = count_pref_format_to_array(csvfile)
         print("Preference Matrix")
-        print(preference_matrix(ranks))
+        print(preference_matrix(ranks, weights))
         print("Strongest Paths")
-        print(strongest_paths_matrix(ranks))
+        print(strongest_paths_matrix(ranks, weights=weights))
         print("Rankings from Schulze Method")
-        print(schulze_method(ranks, headers))
+        print(schulze_method(ranks, headers, weights))
 
 if __name__ == '__main__':
     ranks = np.genfromtxt('./data/happiness_rankings.csv', dtype=int, delimiter=',', names=True, comments='#')
@@ -1,44 +1,38 @@
+import functools
 import re
 
-import spacy
+import numpy as np
 
-from adjective_and_definition_retrieval import *
+from adjective_and_definition_retrieval import get_most_likely_wordnet_definition
+from lexicons import intensifiers, downtoners, adj_intensity_map, lexicon_matcher
+import nlp_models
 import wiktionary_dict
+import wordnet_cache
 
-high = 1.0
-low = -1.0
-A = 1.4
-A2 = 1.2
-B = 0.8
-B2 = 0.6
-
-# adverbs that increases the intensity of the word
-intensifiers = {"extremely": A, "intensely": A, "exceptionally": A, "astoundingly": A, "excessively": A,
-                "totally": A, "absolutely": A, "completely": A, "oppressively": A, "incredibly": A, "remarkably": A,
-                "particularly": A, "unusually": A, "amazingly": A, "unbearably": A, "utterly": A, "dangerously": A,
-                "extraordinarily": A, "really": A, "very": A, "highly": A}
-
-# adverbs that decrease the intensity of the word
-downtoners = {"fairly": B, "pretty": B, "quite": B, "rather": B, "moderately": B, "somewhat": B,
-              "reasonably": B2, "slightly": B2, "a little": B2, "mildly": B2, "a bit": B2,
-              "pleasantly": B2, "not_quite": -0.6}
-
-# not quite gets parsed incorrectly by spacy so manual conversion to not_quite is necessary
-
-adj_intensity_map = {"high": high, "good": high, "great": high, "higher": high, "better": high, "greater": high,
-                     "low": low, "bad": low, "little": low, "lower": low, "worse": low}
 
 def merge_compound_nouns(sentence, nlp = None):
     if nlp is None:
-        nlp = spacy.load("en")
-    doc = nlp(sentence)
+        nlp = nlp_models.get_model()
+    return merge_doc_compound_nouns(nlp(sentence))
 
-    for np in doc.noun_chunks:
-        while len(np) > 1 and np[0].dep_ != 'compound':
-            np = np[1:]
-        if len(np) > 1:
-            # Merge the tokens
-            np.merge()
+
+def merge_doc_compound_nouns(doc):
+    """
+    Merges the compound nouns of an already parsed definition.
+    :param doc: A spacy doc. Its compound noun chunks are merged in place, keeping the tags and dependencies of the
+    rest of the parse, so the doc can be scored without parsing the merged text again.
+    :return: A string with underscores between the words of compound nouns.
+    """
+    compound_nouns = []
+    for noun_chunk in doc.noun_chunks:
+        while len(noun_chunk) > 1 and noun_chunk[0].dep_ != 'compound':
+            noun_chunk = noun_chunk[1:]
+        if len(noun_chunk) > 1:
+            compound_nouns.append(noun_chunk)
+    # Merge the tokens. Noun chunks don't overlap, so they can all be merged at once
+    with doc.retokenize() as retokenizer:
+        for compound_noun in compound_nouns:
+            retokenizer.merge(compound_noun)
 
     results = []
     # Put underscores between compound nouns
@@ -48,6 +42,28 @@ def merge_compound_nouns(sentence, nlp = None):
     return " ".join(results)
 
 
+@functools.lru_cache(maxsize=None)
+def get_derivational_index(property_name):
+    """
+    Maps adjectives that are derivationally related to property_name to 1, and their antonyms to -1.
+    i.e. for brightness: {"bright": 1, "dull": -1, ...}
+    Built once per property name and shared by the score functions.
+    When an adjective appears more than once, the first relation found while walking WordNet wins.
+    :param property_name: A string containing an attribute i.e. "temperature".
+    :return: A dictionary mapping adjective names to 1 or -1.
+    """
+    index = {}
+    for synset in wordnet_cache.synsets(property_name, wordnet_cache.NOUN):
+        for lemma in wordnet_cache.lemmas(synset):
+            derivationally_related_forms = wordnet_cache.derivationally_related_forms(lemma)
+            for derivationally_related_form in derivationally_related_forms:
+                index.setdefault(derivationally_related_form.name(), 1)
+            for derivationally_related_form in derivationally_related_forms:
+                for antonym in wordnet_cache.antonyms(derivationally_related_form):
+                    index.setdefault(antonym.name(), -1)
+    return index
+
+
 def get_definition(adjective, keywords, wiki_dict):
     try:
         definitions = wiki_dict[adjective]["A"]
@@ -90,56 +106,48 @@ def get_score_using_next_word(property_name, adjective, keywords, wiki_dict, def
     score = default_score
     # handles property_names like brightness (attributes bright and dull)
     # bright's wiktionary definition doesn't have any words that would impact the score
-    synsets = wn.synsets(property_name, wn.NOUN)
-    for synset in synsets:
-        lemmas = synset.lemmas()
-        for lemma in lemmas:
-            derivationally_related_forms = lemma.derivationally_related_forms()
-            if adjective in [x.name() for x in derivationally_related_forms]:
-                return 1
-            else:
-                for derivationally_related_form in derivationally_related_forms:
-                    antonyms = [s.name() for s in derivationally_related_form.antonyms()]
-                    if adjective in antonyms:
-                        return -1
+    derivational_score = get_derivational_index(property_name).get(adjective)
+    if derivational_score is not None:
+        return derivational_score
 
     definition = get_definition(adjective, keywords, wiki_dict)
     definition = re.findall(r"[\w']+", definition)
+    matches = lexicon_matcher.find(definition)
 
+    # each entry counts once, at its first occurrence followed by a matching word
     for adj in adj_intensity_map:
-        if adj in definition:
-            index = definition.index(adj)
-            if index + 1 < len(definition) and (
-                            definition[index + 1] == property_name or definition[index + 1] in adj_intensity_map):
+        for index in matches['adjectives'].get(adj, []):
+            if index < len(definition) and (
+                            definition[index] == property_name or definition[index] in adj_intensity_map):
                 score += adj_intensity_map[adj]
+                break
 
     intensity = 0
     num_intensifiers = 0
     for intensifier in intensifiers:
-        if intensifier in definition:
-            index = definition.index(intensifier)
-            if index + 1 < len(definition) and (
-                            definition[index + 1] in keywords or definition[index + 1] in adj_intensity_map):
+        for index in matches['intensifiers'].get(intensifier, []):
+            if index < len(definition) and (definition[index] in keywords or definition[index] in adj_intensity_map):
                 intensity += intensifiers[intensifier]
                 num_intensifiers += 1
+                break
     if num_intensifiers > 0:
         score *= (intensity / num_intensifiers)
 
     downtone = 0
     num_downtoners = 0
     for downtoner in downtoners:
-        if downtoner in definition:
-            index = definition.index(downtoner)
-            if index + 1 < len(definition) and definition[index + 1] in keywords:
+        for index in matches['downtoners'].get(downtoner, []):
+            if index < len(definition) and definition[index] in keywords:
                 downtone += downtoners[downtoner]
                 num_downtoners += 1
+                break
     if num_downtoners > 0:
         score *= (downtone / num_downtoners)
 
     return score
 
 
-def get_score_with_spacy(property_name, adjective, keywords, wiki_dict, nlp = None, default_score=0):
+def get_score_with_spacy(property_name, adjective, keywords, wiki_dict, nlp = None, default_score=0, doc_cache=None):
     """
 
     Only factors in adjectives, intensifiers, and downtoners into the score depending on the dependency parse using Spacy.
@@ -147,32 +155,38 @@ def get_score_with_spacy(property_name, adjective, keywords, wiki_dict, nlp = No
     :param adjective: A string containing an adjective.
     :param keywords: An array of strings containing keywords to help find the relevant definition / word sense.
     :param wiki_dict: Result of parsing OntoWiktionary with wiktionary_dict.load_ontology
-    :param nlp: spacy.load object
+    :param nlp: spacy.load object. Defaults to the shared model from nlp_models.
     :param default_score: A float containing the default score.
+    :param doc_cache: Optional parse_cache.ParseCache to reuse parses across runs. Its model is used instead of nlp.
     :return: A float containing the score of the adjective calculated from its definition.
     """
-    if nlp is None:
-        nlp = spacy.load('en')
+    if doc_cache is not None:
+        nlp = doc_cache.parse
+    elif nlp is None:
+        nlp = nlp_models.get_model()
 
-    score = default_score
     # handles property_names like brightness (attributes bright and dull)
     # bright's wiktionary definition doesn't have any words that would impact the score
-    synsets = wn.synsets(property_name, wn.NOUN)
-    for synset in synsets:
-        lemmas = synset.lemmas()
-        for lemma in lemmas:
-            derivationally_related_forms = lemma.derivationally_related_forms()
-            if adjective in [x.name() for x in derivationally_related_forms]:
-                return 1
-            else:
-                for derivationally_related_form in derivationally_related_forms:
-                    antonyms = [s.name() for s in derivationally_related_form.antonyms()]
-                    if adjective in antonyms:
-                        return -1
+    derivational_score = get_derivational_index(property_name).get(adjective)
+    if derivational_score is not None:
+        return derivational_score
 
     definition = get_definition(adjective, keywords, wiki_dict)
 
-    doc = nlp(merge_compound_nouns(definition, nlp))
+    doc = nlp(definition)
+    merge_doc_compound_nouns(doc)
+    return get_doc_score(property_name, doc, keywords, default_score)
+
+
+def get_doc_score(property_name, doc, keywords, default_score=0):
+    """
+    Scores a parsed definition for get_score_with_spacy.
+    :param doc: A spacy doc of the definition, with compound nouns merged by merge_doc_compound_nouns.
+    :param keywords: An array of strings containing keywords to help find the relevant definition / word sense.
+    :param default_score: A float containing the default score.
+    :return: A float containing the score of the adjective calculated from its definition.
+    """
+    score = default_score
     for word in doc:
         if (word.tag_ == "JJ" or word.tag_ == "JJR") \
                 and word.text in adj_intensity_map \
@@ -211,32 +225,23 @@ def get_score_simple(property_name, adjective, keywords, wiki_dict, default_scor
 
     # handles property_names like brightness (attributes bright and dull)
     # bright's wiktionary definition doesn't have any words that would impact the score
-    synsets = wn.synsets(property_name, wn.NOUN)
-    for synset in synsets:
-        lemmas = synset.lemmas()
-        for lemma in lemmas:
-            derivationally_related_forms = lemma.derivationally_related_forms()
-            if adjective in [x.name() for x in derivationally_related_forms]:
-                return 1
-            else:
-                for derivationally_related_form in derivationally_related_forms:
-                    antonyms = [s.name() for s in derivationally_related_form.antonyms()]
-                    if adjective in antonyms:
-                        return -1
+    derivational_score = get_derivational_index(property_name).get(adjective)
+    if derivational_score is not None:
+        return derivational_score
 
     score = default_score
 
     definition = get_definition(adjective, keywords, wiki_dict)
-    definition = re.findall(r"[\w']+", definition)
+    matches = lexicon_matcher.find(re.findall(r"[\w']+", definition))
 
     for adj in adj_intensity_map:
-        if adj in definition:
+        if adj in matches['adjectives']:
             score += adj_intensity_map[adj]
 
     intensity = 0
     num_intensifiers = 0
     for intensifier in intensifiers:
-        if intensifier in definition:
+        if intensifier in matches['intensifiers']:
             intensity += intensifiers[intensifier]
             num_intensifiers += 1
     if num_intensifiers > 0:
@@ -245,10 +250,59 @@ def get_score_simple(property_name, adjective, keywords, wiki_dict, default_scor
     downtone = 0
     num_downtoners = 0
     for downtoner in downtoners:
-        if downtoner in definition:
+        if downtoner in matches['downtoners']:
             downtone += downtoners[downtoner]
             num_downtoners += 1
     if num_downtoners > 0:
         score *= (downtone / num_downtoners)
 
     return score
+
+
+score_functions = {'next_word': get_score_using_next_word, 'spacy': get_score_with_spacy, 'simple': get_score_simple}
+
+
+def score_many(property_name, adjectives, keywords, wiki_dict, method='next_word', nlp=None, default_score=0,
+               batch_size=256, doc_cache=None):
+    """
+    Scores a whole list of adjectives at once.
+    With the spacy method, all definitions are retrieved first and parsed once, in batches with nlp.pipe,
+    instead of loading and running the model for each adjective.
+
+    :param adjectives: A list of strings containing adjectives.
+    :param keywords: An array of strings containing keywords to help find the relevant definition / word sense.
+    :param wiki_dict: Result of parsing OntoWiktionary with wiktionary_dict.load_ontology
+    :param method: One of score_functions: next_word, spacy or simple.
+    :param nlp: spacy.load object. Only used by the spacy method, defaults to the shared model from nlp_models.
+    :param default_score: A float containing the default score.
+    :param batch_size: Number of definitions spacy parses per batch.
+    :param doc_cache: Optional parse_cache.ParseCache to reuse parses across runs. Its model is used instead of nlp.
+    :return: A numpy array with the score of each adjective, in the order of adjectives.
+    """
+    scores = np.full(len(adjectives), default_score, dtype=float)
+    if method != 'spacy':
+        for (i, adjective) in enumerate(adjectives):
+            scores[i] = score_functions[method](property_name, adjective, keywords, wiki_dict,
+                                                default_score=default_score)
+        return scores
+
+    if doc_cache is not None:
+        pipe = doc_cache.pipe
+    else:
+        if nlp is None:
+            nlp = nlp_models.get_model()
+        pipe = nlp.pipe
+
+    derivational_index = get_derivational_index(property_name)
+    to_parse = []
+    for (i, adjective) in enumerate(adjectives):
+        if adjective in derivational_index:
+            scores[i] = derivational_index[adjective]
+        else:
+            to_parse.append(i)
+
+    definitions = [get_definition(adjectives[i], keywords, wiki_dict) for i in to_parse]
+    for (i, doc) in zip(to_parse, pipe(definitions, batch_size=batch_size)):
+        merge_doc_compound_nouns(doc)
+        scores[i] = get_doc_score(property_name, doc, keywords, default_score)
+    return scores
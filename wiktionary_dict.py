@@ -1,27 +1,127 @@
 #!/usr/bin/env python3
 
+import argparse
 import bz2
+import os
+import sqlite3
+import sys
+from collections.abc import Mapping
 
-from lxml import etree
+INDEX_EXTENSION = '.sqlite'
 
 
-def load_ontology(f):
-    tree = etree.parse(f)
-    results = tree.xpath('/OntoWiktionary[@lang="en"]/Concept/Lexicalization')
+def iter_lexicalizations(f, pos=None):
+    """
+    Incrementally parses OntoWiktionary, yielding one lexicalization at a time.
+    Each Concept element is cleared once its lexicalizations are read, so the whole tree is never held in memory.
+    :param f: A path or file object containing the OntoWiktionary xml, i.e. bz2.open(path).
+    :param pos: Optional string (N, A, V or R). If given, only lexicalizations with this part of speech are kept.
+    :return: A generator of (lemma, pos, sense, definition) tuples.
+    """
+    # only needed to parse the xml dump, not to read an index
+    from lxml import etree
+    for _, concept in etree.iterparse(f, events=('end',), tag='Concept'):
+        root = concept.getparent()
+        if root is not None and root.tag == 'OntoWiktionary' and root.get('lang') == 'en':
+            for r in concept.iterchildren('Lexicalization'):
+                lemma_pos = r.attrib['pos']
+                if pos is not None and lemma_pos != pos:
+                    continue
+                yield r.attrib['lemma'], lemma_pos, r.attrib['id'].split(":")[-1], r.text
+
+        # free the parsed concept and any siblings already processed
+        concept.clear()
+        while concept.getprevious() is not None:
+            del concept.getparent()[0]
+
 
+def load_ontology(f, pos=None):
+    """
+    Parses OntoWiktionary into a dict mapping lemma to pos to sense to definition.
+    :param f: A path or file object containing the OntoWiktionary xml, i.e. bz2.open(path).
+    :param pos: Optional string (N, A, V or R). If given, only lexicalizations with this part of speech are kept.
+    :return: A dictionary of the form wiki_dict[lemma][pos][sense] = definition.
+    """
     wiki_dict = {}
-    for r in results:
-        lemma = r.attrib['lemma']
-        pos = r.attrib['pos']
-        sense = r.attrib['id'].split(":")[-1]
+    for lemma, lemma_pos, sense, text in iter_lexicalizations(f, pos):
         if lemma not in wiki_dict:
             wiki_dict[lemma] = {}
-        if pos not in wiki_dict[lemma]:
-            wiki_dict[lemma][pos] = {}
-        wiki_dict[lemma][pos][sense] = r.text
+        if lemma_pos not in wiki_dict[lemma]:
+            wiki_dict[lemma][lemma_pos] = {}
+        wiki_dict[lemma][lemma_pos][sense] = text
     return wiki_dict
 
 
+def build_index(f, index_path, pos=None):
+    """
+    Writes OntoWiktionary to an SQLite index that can be opened with WiktionaryIndex.
+    Only needs to be run once; afterwards lookups no longer require parsing the xml.
+    :param f: A path or file object containing the OntoWiktionary xml, i.e. bz2.open(path).
+    :param index_path: Path to the SQLite file to create. An existing index is replaced.
+    :param pos: Optional string (N, A, V or R). If given, only lexicalizations with this part of speech are kept.
+    """
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    connection = sqlite3.connect(index_path)
+    with connection:
+        connection.execute("CREATE TABLE lexicalization (lemma TEXT, pos TEXT, sense TEXT, definition TEXT)")
+        connection.executemany("INSERT INTO lexicalization VALUES (?, ?, ?, ?)", iter_lexicalizations(f, pos))
+        connection.execute("CREATE INDEX lexicalization_lemma ON lexicalization (lemma)")
+    connection.close()
+
+
+class WiktionaryIndex(Mapping):
+    """
+    Read-only mapping over an index written by build_index.
+    Behaves like the dict returned by load_ontology: wiki[lemma][pos][sense] = definition,
+    but each lemma is only read from disk when it is looked up.
+    """
+
+    def __init__(self, index_path):
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(index_path)
+        self.connection = sqlite3.connect(index_path, check_same_thread=False)
+
+    def __getitem__(self, lemma):
+        rows = self.connection.execute("SELECT pos, sense, definition FROM lexicalization WHERE lemma = ?",
+                                       (lemma,)).fetchall()
+        if not rows:
+            raise KeyError(lemma)
+        entry = {}
+        for pos, sense, definition in rows:
+            if pos not in entry:
+                entry[pos] = {}
+            entry[pos][sense] = definition
+        return entry
+
+    def __contains__(self, lemma):
+        row = self.connection.execute("SELECT 1 FROM lexicalization WHERE lemma = ? LIMIT 1", (lemma,)).fetchone()
+        return row is not None
+
+    def __iter__(self):
+        for (lemma,) in self.connection.execute("SELECT DISTINCT lemma FROM lexicalization"):
+            yield lemma
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(DISTINCT lemma) FROM lexicalization").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+def open_ontology(path, pos=None):
+    """
+    Opens OntoWiktionary from either the bz2 xml dump or an index written by build_index.
+    :param path: Path to 2011-08-01_OntoWiktionary_EN.xml.bz2 or to a `.sqlite` index.
+    :param pos: Optional string (N, A, V or R). Only used when parsing the xml dump.
+    :return: A dict or WiktionaryIndex supporting wiki[lemma][pos][sense] lookups.
+    """
+    if path.endswith(INDEX_EXTENSION):
+        return WiktionaryIndex(path)
+    with bz2.open(path) as f:
+        return load_ontology(f, pos)
+
+
 def get_most_likely_definition(definitions, keywords):
     """
 
@@ -39,8 +139,18 @@ def get_most_likely_definition(definitions, keywords):
     return definitions["1"]
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("wiktionary", nargs='?', default='./data/2011-08-01_OntoWiktionary_EN.xml.bz2',
+                        help="Path to 2011-08-01_OntoWiktionary_EN.xml.bz2 or to an index built with --build_index")
+    parser.add_argument("--build_index", help="Write an SQLite index of the xml dump to this path and exit", type=str)
+    args = parser.parse_args()
+
+    if args.build_index:
+        with bz2.open(args.wiktionary) as f:
+            build_index(f, args.build_index)
+        sys.exit()
 
-    wiki = load_ontology(bz2.open('./data/2011-08-01_OntoWiktionary_EN.xml.bz2'))
+    wiki = open_ontology(args.wiktionary)
 
     while True:
         entry = input("\nEnter [word,POS] (POS must be N, A, V, or R) (EXIT to break): ")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import functools
+
+import profiling
+
+# Maximum number of results kept per relation
+CACHE_SIZE = 65536
+
+# WordNet parts of speech, the same as wn.NOUN, wn.VERB, wn.ADJ and wn.ADV
+NOUN = 'n'
+VERB = 'v'
+ADJ = 'a'
+ADV = 'r'
+
+
+@functools.lru_cache(maxsize=1)
+def wordnet():
+    # nltk takes about a second to import, so it's only imported on the first lookup
+    from nltk.corpus import wordnet as wn
+    return wn
+
+
+@functools.lru_cache(maxsize=1)
+def archaism():
+    return wordnet().synsets("archaism")[0]
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def synsets(word, pos=None):
+    return tuple(wordnet().synsets(word, pos))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def attributes(synset):
+    return tuple(synset.attributes())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def similar_tos(synset):
+    return tuple(synset.similar_tos())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def also_sees(synset):
+    return tuple(synset.also_sees())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def lemma_names(synset):
+    return tuple(synset.lemma_names())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def lemmas(synset):
+    return tuple(synset.lemmas())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def definition(synset):
+    return synset.definition()
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def usage_domains(synset):
+    return tuple(synset.usage_domains())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def derivationally_related_forms(lemma):
+    return tuple(lemma.derivationally_related_forms())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def antonyms(lemma):
+    return tuple(lemma.antonyms())
+
+
+def is_archaic(synset):
+    return archaism() in usage_domains(synset)
+
+
+cached_functions = [archaism, synsets, attributes, similar_tos, also_sees, lemma_names, lemmas, definition,
+                    usage_domains, derivationally_related_forms, antonyms]
+
+
+def cache_stats():
+    """
+    :return: A dictionary mapping each cached WordNet lookup to its hits, misses, size and hit rate.
+    """
+    stats = {}
+    for function in cached_functions:
+        info = function.cache_info()
+        calls = info.hits + info.misses
+        stats[function.__name__] = {'hits': info.hits, 'misses': info.misses, 'size': info.currsize,
+                                    'hit_rate': info.hits / calls if calls else 0.0}
+    return stats
+
+
+def clear_caches():
+    for function in cached_functions:
+        function.cache_clear()
+
+
+profiling.register_cache('wordnet', cache_stats)